@@ -1,64 +1,31 @@
-import gradio as gr
-import openai
-from openai import OpenAI
-import os
-import requests
+# Modules below read their settings at import time, so .env is loaded first
 from dotenv import load_dotenv
-import asyncio
-from openai import AsyncOpenAI
 
-# Load environment variables from .env file
 load_dotenv()
-# Access the API key
-openai_api_key = os.getenv("OPENAI_API_KEY")
-YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-
-# Initialize OpenAI API client
-client = openai.OpenAI(api_key=openai_api_key)
-async_client = AsyncOpenAI(api_key=openai_api_key)
-
-async def tts_itinerary(text, instructions, voice="nova"):
-	from aiohttp import ClientSession
-
-	output_path = "/tmp/itinerary.wav"
-
-	url = "https://api.openai.com/v1/audio/speech"
-	headers = {
-		"Authorization": f"Bearer {openai_api_key}",
-		"Content-Type": "application/json"
-	}
-	payload = {
-		"model": "gpt-4o-mini-tts",
-		"input": text,
-		"voice": voice,
-		"instructions": instructions,
-		"response_format": "wav"
-	}
-
-	async with ClientSession() as session:
-		async with session.post(url, headers=headers, json=payload) as resp:
-			if resp.status != 200:
-				error_text = await resp.text()
-				raise Exception(f"TTS failed: {resp.status} - {error_text}")
-			
-			with open(output_path, "wb") as f:
-				while True:
-					chunk = await resp.content.read(1024)
-					if not chunk:
-						break
-					f.write(chunk)
-
-	return output_path
+
+import gradio as gr
+import os
+from functools import lru_cache
+
+
+# Initialize OpenAI API client on first use
+@lru_cache(maxsize=1)
+def get_client():
+    import openai
+
+    return openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 
 def sync_tts_wrapper(text):
-	instructions = (
-		"Voice: Friendly and enthusiastic, like a museum guide talking to kids. "
-		"Tone: Excited, informative, curious. Delivery: Clear and fun."
-	)
-	return asyncio.run(tts_itinerary(text, instructions))
+    from tts import sync_tts_wrapper
+
+    return sync_tts_wrapper(text)
+
 
+def search_youtube_videos(query):
+    from youtube_search import search_youtube_videos
 
+    return search_youtube_videos(query)
 
 # ✨ Itinerary Generator Logic
 def generate_itinerary(age, interests, language, expectations, learning_goals, eta, estimated_staying_time):
@@ -97,7 +64,7 @@ def generate_itinerary(age, interests, language, expectations, learning_goals, e
         "\"Number. Title - explanation\"\n"
     )
 
-    response = client.chat.completions.create(
+    response = get_client().chat.completions.create(
         model="gpt-3.5-turbo",  # or "gpt-4" if you're on free tier
         messages=[
             {"role": "system", "content": system_prompt},
@@ -125,7 +92,7 @@ def answer_question(age, question):
         "Please respond with a clear, fun explanation suitable for their age, and reference any relevant exhibit or concept."
     )
 
-    response = client.chat.completions.create(
+    response = get_client().chat.completions.create(
         model="gpt-3.5-turbo",  # Or use "gpt-4" if available
         messages=[
             {"role": "system", "content": system_prompt},
@@ -156,7 +123,7 @@ def generate_exit_ticket(age, exhibits, favorite_part):
     )
 
     # Generate the Exit Ticket
-    response = client.chat.completions.create(
+    response = get_client().chat.completions.create(
         model="gpt-3.5-turbo",
         messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
     )
@@ -167,33 +134,6 @@ def generate_exit_ticket(age, exhibits, favorite_part):
     # 📺 Get 3 video recommendations from The Franklin Institute's YouTube channel based on the exhibits visited
     # https://www.youtube.com/@TheFranklinInstitutePHL/videos
     # search_youtube_videos() function to be defined: YOUTUBE_API_KEY
-def search_youtube_videos(query, CHANNEL_ID="UCpAQimPOzeu_VRWRs_S4cPw"):
-	"""
-	Returns a list of top 3 videos from a YouTube channel based on a query.
-	Each entry includes: title, video_id
-	"""
-	base_url = "https://www.googleapis.com/youtube/v3/search"
-	params = {
-		"key": YOUTUBE_API_KEY,
-		"channelId": CHANNEL_ID,
-		"part": "snippet",
-		"q": query,
-		"maxResults": 3,
-		"order": "relevance",
-		"type": "video"
-	}
-
-	response = requests.get(base_url, params=params)
-	data = response.json()
-
-	results = []
-	for item in data.get("items", []):
-		video_id = item["id"]["videoId"]
-		title = item["snippet"]["title"]
-		results.append((title, video_id))
-
-	return results
-
 def format_embedded_videos(video_data):
 	"""
 	Accepts a list of (title, video_id) and returns Markdown with embedded iframes.
@@ -312,79 +252,87 @@ button:hover {
 """
 
 
-with gr.Blocks(title="Museum Itinerary Generator", css=css, theme=gr.themes.Default(primary_hue="orange")) as demo:
-    gr.Markdown("# 🏛️ Museum Itinerary Generator")
+def create_app():
+    """
+    Builds the Gradio Blocks UI without launching it.
+    """
+    with gr.Blocks(title="Museum Itinerary Generator", css=css, theme=gr.themes.Default(primary_hue="orange")) as demo:
+        gr.Markdown("# 🏛️ Museum Itinerary Generator")
     
-    # Kid Information Section
-    with gr.Group():
-        gr.Markdown("## 👶 Kid Information")
-        age = gr.Textbox(label="Age", placeholder="10")
-        interests = gr.CheckboxGroup(
-            label="What are the interested topics of your kids? (Select at least one)",
-            choices=["Space exploration", "Human biology", "Technology and innovation", 
-                    "Physics and mechanics", "Environmental science", "History of science"]
-        )
+        # Kid Information Section
+        with gr.Group():
+            gr.Markdown("## 👶 Kid Information")
+            age = gr.Textbox(label="Age", placeholder="10")
+            interests = gr.CheckboxGroup(
+                label="What are the interested topics of your kids? (Select at least one)",
+                choices=["Space exploration", "Human biology", "Technology and innovation", 
+                        "Physics and mechanics", "Environmental science", "History of science"]
+            )
     
-    # Visit Information Section
-    with gr.Group():
-        gr.Markdown("## 🕒 Visit Information")
-        arrival_time = gr.Slider(
-            label="Estimated arrive time",
-            minimum=9, maximum=17, step=1, value=12,
-            info="Drag to adjust between 9:00 and 17:00"
-        )
-        duration = gr.Radio(
-            label="Duration",
-            choices=["1 hour", "2 hours", "3 hours (recommended)", "4 hours", "> 4 hours"],
-            value="3 hours (recommended)"
-        )
-        language = gr.Radio(
-            label="Language preference",
-            choices=["English", "Spanish", "French", "Chinese", "Arabic"],
-            value="English"
-        )
-        expectations = gr.Textbox(
-            label="Other expectations (Optional)",
-            placeholder="E.g., wheelchair accessibility, quiet areas...",
-            lines=3
-        )
+        # Visit Information Section
+        with gr.Group():
+            gr.Markdown("## 🕒 Visit Information")
+            arrival_time = gr.Slider(
+                label="Estimated arrive time",
+                minimum=9, maximum=17, step=1, value=12,
+                info="Drag to adjust between 9:00 and 17:00"
+            )
+            duration = gr.Radio(
+                label="Duration",
+                choices=["1 hour", "2 hours", "3 hours (recommended)", "4 hours", "> 4 hours"],
+                value="3 hours (recommended)"
+            )
+            language = gr.Radio(
+                label="Language preference",
+                choices=["English", "Spanish", "French", "Chinese", "Arabic"],
+                value="English"
+            )
+            expectations = gr.Textbox(
+                label="Other expectations (Optional)",
+                placeholder="E.g., wheelchair accessibility, quiet areas...",
+                lines=3
+            )
     
 
-    itinerary_output = gr.Textbox(
-		label="🎟️ Your Personalized Museum Itinerary",
-		lines=20
-	)
-    audio_output = gr.Audio(label="🔊 Listen to Itinerary", type="filepath")
-
-    with gr.Row():
-        generate_btn = gr.Button("Generate Itinerary", variant="primary")
-        tts_btn = gr.Button("🔊 Play Audio", visible=False)
-
-    generate_btn.click(
-            fn=generate_itinerary_response,
-            inputs=[age, interests, arrival_time, duration, language, expectations],
-            outputs=itinerary_output
-        ).then(
-            fn=lambda: gr.update(visible=True),
-            outputs=tts_btn
-    )
+        itinerary_output = gr.Textbox(
+    		label="🎟️ Your Personalized Museum Itinerary",
+    		lines=20
+    	)
+        audio_output = gr.Audio(label="🔊 Listen to Itinerary", type="filepath")
+
+        with gr.Row():
+            generate_btn = gr.Button("Generate Itinerary", variant="primary")
+            tts_btn = gr.Button("🔊 Play Audio", visible=False)
+
+        generate_btn.click(
+                fn=generate_itinerary_response,
+                inputs=[age, interests, arrival_time, duration, language, expectations],
+                outputs=itinerary_output
+            ).then(
+                fn=lambda: gr.update(visible=True),
+                outputs=tts_btn
+        )
 
-    tts_btn.click(
-        fn=sync_tts_wrapper,
-        inputs=[itinerary_output],
-        outputs=audio_output
-    )
+        tts_btn.click(
+            fn=sync_tts_wrapper,
+            inputs=[itinerary_output],
+            outputs=audio_output
+        )
 	
-    video_markdown = gr.HTML(visible=False)
+        video_markdown = gr.HTML(visible=False)
 
-    def get_videos_and_display(query):
-        videos = search_youtube_videos(query)
-        return gr.update(value=format_embedded_videos(videos), visible=True)
+        def get_videos_and_display(query):
+            videos = search_youtube_videos(query)
+            return gr.update(value=format_embedded_videos(videos), visible=True)
+
+        gr.Button("🔎 Show Recommended Videos").click(
+            fn=get_videos_and_display,
+            inputs=[gr.Textbox(value="space", visible=False)],
+            outputs=video_markdown
+        )
+
+    return demo
 
-    gr.Button("🔎 Show Recommended Videos").click(
-        fn=get_videos_and_display,
-        inputs=[gr.Textbox(value="space", visible=False)],
-        outputs=video_markdown
-    )
 
-demo.launch()
+if __name__ == "__main__":
+    create_app().launch()
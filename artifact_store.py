@@ -0,0 +1,172 @@
+"""
+Content-addressed on-disk store for generated artifacts such as TTS audio.
+
+Artifacts are keyed by a hash of everything that determines their content,
+so identical requests reuse the same file. Writes go to a temporary file in
+the store directory and are renamed into place, so concurrent writers and
+readers never see a partial file. The store is kept under a byte budget by
+evicting the least recently used files. Writes only add to a running byte
+total; the directory is scanned when the total passes the budget (then
+evicting down to a low-water mark) or has not been checked for a while,
+which also picks up files written by other worker processes. The methods
+block on disk I/O, so async code calls them through asyncio.to_thread.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+# Eviction frees space down to this share of the budget, so the store is
+# not rescanned on every write once it is full
+LOW_WATER_SHARE = 0.9
+# Rescan at least this often to count other workers' writes
+RESCAN_SECONDS = 300
+
+
+def artifact_key(*parts):
+    """
+    Returns a stable hex digest for the given key parts.
+    """
+    encoded = json.dumps(parts, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ArtifactStore:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Bytes in the store as of the last scan plus this process's writes
+        self._total = None
+        self._scanned_at = 0.0
+
+    def path_for(self, key, extension):
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    def get(self, key, extension):
+        """
+        Returns the path of a stored artifact, or None on a miss. A hit marks
+        the file as recently used.
+        """
+        path = self.path_for(key, extension)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    @contextmanager
+    def writer(self, key, extension):
+        """
+        Yields a binary file to write the artifact into. The artifact only
+        becomes visible once the block exits without an error.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                yield f
+            path = self.path_for(key, extension)
+            try:
+                replaced = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        self._added(os.path.getsize(path) - replaced, keep=path)
+
+    def write(self, key, extension, chunks):
+        """
+        Stores an artifact from byte chunks and returns its path.
+        """
+        with self.writer(key, extension) as f:
+            for chunk in chunks:
+                f.write(chunk)
+        return self.path_for(key, extension)
+
+    def _added(self, size, keep):
+        with self._lock:
+            stale = self._total is None or time.monotonic() - self._scanned_at > RESCAN_SECONDS
+            if not stale:
+                self._total += size
+            scan = stale or self._total > self.max_bytes
+        if scan:
+            self.evict(keep=keep)
+
+    def evict(self, keep=None):
+        """
+        Scans the store and, if it is over budget, deletes least recently
+        used artifacts until it is back under the low-water mark.
+        """
+        with self._lock:
+            entries = []
+            total = 0
+            self._scanned_at = time.monotonic()
+            try:
+                names = os.listdir(self.directory)
+            except FileNotFoundError:
+                self._total = 0
+                return
+            for name in names:
+                if name.endswith(".part"):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            entries.sort()
+            target = self.max_bytes * LOW_WATER_SHARE if total > self.max_bytes else self.max_bytes
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.evictions += 1
+            self._total = total
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+audio_store = ArtifactStore(
+    os.getenv("MUSEO_AUDIO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "museo-audio")),
+    int(os.getenv("MUSEO_AUDIO_CACHE_BYTES", str(512 * 1024 * 1024))),
+)
+thumbnail_store = ArtifactStore(
+    os.getenv("MUSEO_THUMBNAIL_CACHE_DIR", os.path.join(tempfile.gettempdir(), "museo-thumbnails")),
+    int(os.getenv("MUSEO_THUMBNAIL_CACHE_BYTES", str(64 * 1024 * 1024))),
+)
+
+
+metrics.register_stats(
+    "museo_artifact_store", "Artifact store", ("store",),
+    lambda: {("audio",): audio_store.stats(), ("thumbnail",): thumbnail_store.stats()},
+    counters=("hits", "misses", "evictions"),
+)
@@ -0,0 +1,77 @@
+"""
+Joins separately synthesized audio files into one without re-encoding.
+
+WAV parts are merged into a single RIFF file with the combined PCM data.
+MP3 and ADTS AAC are frame streams, so their parts are concatenated as is
+(after dropping the ID3 tag of every MP3 part but the first).
+"""
+import struct
+
+STITCHABLE_FORMATS = ("wav", "mp3", "aac", "pcm")
+
+
+def _wav_parts(data):
+    """
+    Returns (fmt chunk body, PCM data) of a WAV file. Streamed WAV output
+    may carry placeholder sizes, so the data chunk runs to the end of the file.
+    """
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("not a WAV file")
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        size = struct.unpack("<I", data[offset + 4:offset + 8])[0]
+        body_start = offset + 8
+        if chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data before fmt chunk")
+            end = len(data) if size in (0, 0xFFFFFFFF) else min(body_start + size, len(data))
+            return fmt, data[body_start:end]
+        if chunk_id == b"fmt ":
+            fmt = data[body_start:body_start + size]
+        offset = body_start + size + (size & 1)
+    raise ValueError("WAV file has no data chunk")
+
+
+def strip_id3(data):
+    if data[:3] != b"ID3" or len(data) < 10:
+        return data
+    # The tag size is a 28-bit "syncsafe" integer
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return data[10 + size + footer:]
+
+
+def stitch(paths, out, audio_format):
+    """
+    Writes the audio files at paths, in order, to the binary file out as
+    one continuous file of the same format.
+    """
+    if audio_format not in STITCHABLE_FORMATS:
+        raise ValueError(f"cannot join {audio_format} files without re-encoding")
+
+    if audio_format == "wav":
+        fmt = None
+        pcm = []
+        for path in paths:
+            with open(path, "rb") as f:
+                part_fmt, part_pcm = _wav_parts(f.read())
+            if fmt is not None and part_fmt != fmt:
+                raise ValueError("WAV parts have different formats")
+            fmt = part_fmt
+            pcm.append(part_pcm)
+        data_size = sum(len(part) for part in pcm)
+        out.write(b"RIFF" + struct.pack("<I", 4 + 8 + len(fmt) + 8 + data_size) + b"WAVE")
+        out.write(b"fmt " + struct.pack("<I", len(fmt)) + fmt)
+        out.write(b"data" + struct.pack("<I", data_size))
+        for part in pcm:
+            out.write(part)
+        return
+
+    for index, path in enumerate(paths):
+        with open(path, "rb") as f:
+            data = f.read()
+        if audio_format == "mp3" and index > 0:
+            data = strip_id3(data)
+        out.write(data)
@@ -0,0 +1,239 @@
+"""
+Batch generation for school field trips.
+
+Reads a CSV roster of visitor profiles and generates an itinerary or exit
+ticket for each, through the same pipelines as the Gradio handlers in
+test.py. Rows with the same normalized profile are generated once, at
+most --concurrency at a time.
+
+    python batch.py itinerary roster.csv --output trip/
+    python batch.py exit_ticket roster.csv --output tickets.jsonl --concurrency 16
+
+Itinerary columns: age, interests, language, expectations, learning_goals,
+eta, estimated_staying_time. Exit ticket columns: age, exhibits,
+favorite_part. Interests and exhibits are separated by ";". An optional
+name column is carried through to the roster.
+
+With a .jsonl output every finished profile is appended to that file;
+otherwise the output is a directory with one file per profile and a
+checkpoint.jsonl. Either way the checkpoint lets an interrupted run be
+started again with the same command: finished profiles are skipped. A
+roster CSV mapping every input row to its result is written at the end.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+
+# Modules below read their settings at import time, so .env is loaded first
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import http_client
+import metrics
+from artifact_store import artifact_key
+from itinerary_cache import normalize_profile, normalize_text, profile_key
+
+ITINERARY_DEFAULTS = {
+    "age": "10",
+    "interests": "",
+    "language": "English",
+    "expectations": "",
+    "learning_goals": "",
+    "eta": "10:00",
+    "estimated_staying_time": "3 hours (recommended)",
+}
+EXIT_TICKET_DEFAULTS = {"age": "10", "exhibits": "", "favorite_part": ""}
+
+
+def _split_list(value):
+    return [item.strip() for item in (value or "").split(";") if item.strip()]
+
+
+def _age(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return value
+
+
+def itinerary_job(row):
+    """
+    Returns (key, handler arguments) for an itinerary roster row.
+    """
+    values = {name: (row.get(name) or default).strip() for name, default in ITINERARY_DEFAULTS.items()}
+    args = (
+        _age(values["age"]), _split_list(values["interests"]), values["language"],
+        values["expectations"], values["learning_goals"], values["eta"],
+        values["estimated_staying_time"],
+    )
+    return profile_key(normalize_profile(*args)), args
+
+
+def exit_ticket_job(row):
+    """
+    Returns (key, handler arguments) for an exit ticket roster row.
+    """
+    values = {name: (row.get(name) or default).strip() for name, default in EXIT_TICKET_DEFAULTS.items()}
+    exhibits = _split_list(values["exhibits"])
+    key = artifact_key("exit_ticket", str(values["age"]), sorted(exhibits), normalize_text(values["favorite_part"]))
+    return key, (_age(values["age"]), exhibits, values["favorite_part"])
+
+
+async def generate_itinerary(args, use_cache):
+    import test
+
+    itinerary = None
+    async for itinerary, _ in test._itinerary_updates(*args, use_cache):
+        pass
+    return {"itinerary": itinerary}
+
+
+async def generate_exit_ticket(args, use_cache):
+    import test
+
+    html, *video_ids = await test._build_exit_ticket(*args)
+    return {"html": html, "video_ids": [video_id for video_id in video_ids if video_id]}
+
+
+MODES = {
+    "itinerary": (itinerary_job, generate_itinerary, "md"),
+    "exit_ticket": (exit_ticket_job, generate_exit_ticket, "html"),
+}
+
+
+def read_roster(path, make_job):
+    """
+    Returns the roster rows as (row number, name, key) and the handler
+    arguments of each distinct key, in first-seen order.
+    """
+    rows = []
+    jobs = {}
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for number, row in enumerate(csv.DictReader(f), 1):
+            row = {(name or "").strip().lower(): value for name, value in row.items()}
+            key, args = make_job(row)
+            rows.append((number, (row.get("name") or "").strip(), key))
+            jobs.setdefault(key, args)
+    return rows, jobs
+
+
+def load_checkpoint(path):
+    """
+    Returns {key: record} for the profiles finished by earlier runs. A line
+    cut short by an interrupted write is ignored.
+    """
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            done[record["key"]] = record
+    return done
+
+
+async def run_batch(mode, jobs, done, checkpoint_path, output_dir, concurrency, use_cache):
+    """
+    Generates every job not in done, appending each result to the checkpoint
+    as it finishes. Returns {key: error message} for the jobs that failed.
+    """
+    _, generate, extension = MODES[mode]
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = {}
+    pending = [(key, args) for key, args in jobs.items() if key not in done]
+    finished = 0
+
+    async def one(key, args):
+        nonlocal finished
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                with metrics.span("batch", mode):
+                    result = await generate(args, use_cache)
+            except Exception as e:
+                failures[key] = f"{e.__class__.__name__}: {e}"
+                print(f"❌ {key[:12]} failed: {failures[key]}")
+                return
+
+        record = {"key": key, "mode": mode, "args": list(args), **result}
+        if output_dir is not None:
+            record["file"] = f"{key[:16]}.{extension}"
+            with open(os.path.join(output_dir, record["file"]), "w", encoding="utf-8") as f:
+                f.write(result["itinerary"] if mode == "itinerary" else result["html"])
+        # One line per write, so an interrupted run loses at most this record
+        with open(checkpoint_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        done[key] = record
+        finished += 1
+        print(f"✅ {finished}/{len(pending)} {key[:12]} in {time.perf_counter() - start:.1f}s")
+
+    await asyncio.gather(*(one(key, args) for key, args in pending))
+    return failures
+
+
+def write_roster(path, rows, done, failures):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["row", "name", "key", "file", "error"])
+        for number, name, key in rows:
+            record = done.get(key, {})
+            writer.writerow([number, name, key, record.get("file", ""), failures.get(key, "")])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate itineraries or exit tickets for a CSV roster.")
+    parser.add_argument("mode", choices=sorted(MODES))
+    parser.add_argument("roster", help="CSV file of visitor profiles")
+    parser.add_argument("--output", required=True, help="output directory, or a .jsonl file")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("MUSEO_BATCH_CONCURRENCY", "8")))
+    parser.add_argument("--no-cache", action="store_true", help="regenerate itineraries that are already cached")
+    args = parser.parse_args()
+
+    make_job = MODES[args.mode][0]
+    rows, jobs = read_roster(args.roster, make_job)
+
+    if args.output.endswith(".jsonl"):
+        output_dir = None
+        checkpoint_path = args.output
+        roster_path = args.output[:-len(".jsonl")] + ".roster.csv"
+        if os.path.dirname(args.output):
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    else:
+        output_dir = args.output
+        checkpoint_path = os.path.join(output_dir, "checkpoint.jsonl")
+        roster_path = os.path.join(output_dir, "roster.csv")
+        os.makedirs(output_dir, exist_ok=True)
+
+    # The handlers live in test.py, which loads Gradio; import it here
+    # rather than on the shared loop
+    import test  # noqa: F401
+
+    done = load_checkpoint(checkpoint_path)
+    remaining = sum(1 for key in jobs if key not in done)
+    print(f"{len(rows)} rows, {len(jobs)} distinct profiles, {len(jobs) - remaining} already done")
+
+    start = time.perf_counter()
+    try:
+        failures = http_client.run(run_batch(
+            args.mode, jobs, done, checkpoint_path, output_dir, max(args.concurrency, 1), not args.no_cache,
+        ))
+    finally:
+        http_client.close()
+    write_roster(roster_path, rows, done, failures)
+
+    print(f"generated {remaining - len(failures)} profiles in {time.perf_counter() - start:.1f}s, "
+          f"{len(failures)} failed; roster saved to {roster_path}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Before/after benchmark for the async request handlers.
+
+Sends the same batch of chat completions to a local stub server two ways:
+
+- threads: the sync OpenAI client on a 40-thread pool, which is how Gradio
+  ran the old sync handlers (its default worker thread count)
+- async: AsyncOpenAI through openai_scheduler on the shared HTTP loop, which
+  is how the async handlers run now
+
+    python benchmarks/async_concurrency.py --requests 400 --latency 1.0
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openai  # noqa: E402
+
+import http_client  # noqa: E402
+import openai_scheduler  # noqa: E402
+from stub_server import start_stub_server  # noqa: E402
+
+MODEL = "stub-model"
+MESSAGES = [
+    {"role": "system", "content": "You plan museum visits."},
+    {"role": "user", "content": "Plan a 3 hour visit for a 10 year old who likes space."},
+]
+
+
+def run_threads(client, requests, workers):
+    def one():
+        client.chat.completions.create(model=MODEL, messages=MESSAGES)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(one) for _ in range(requests)]
+        for future in futures:
+            future.result()
+
+
+async def run_async(async_client, requests):
+    await asyncio.gather(*[
+        openai_scheduler.achat_completion(async_client, model=MODEL, messages=MESSAGES)
+        for _ in range(requests)
+    ])
+
+
+def report(name, requests, elapsed):
+    print(f"{name:<8} {requests:>8} {elapsed:>10.2f} {requests / elapsed:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=1.0, help="stub response time in seconds")
+    parser.add_argument("--threads", type=int, default=40, help="worker threads for the sync baseline")
+    args = parser.parse_args()
+
+    stub_url, stop = start_stub_server(args.latency)
+    base_url = f"{stub_url}/v1"
+    # The stub has no rate limits; keep the scheduler from throttling it
+    openai_scheduler.MODEL_LIMITS[MODEL] = (10 ** 7, 10 ** 10)
+    client = openai.OpenAI(api_key="stub", base_url=base_url, max_retries=0)
+    async_client = openai.AsyncOpenAI(api_key="stub", base_url=base_url, max_retries=0)
+
+    print(f"{'mode':<8} {'requests':>8} {'seconds':>10} {'req/s':>10}")
+    start = time.perf_counter()
+    run_threads(client, args.requests, args.threads)
+    report("threads", args.requests, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    http_client.run(run_async(async_client, args.requests))
+    report("async", args.requests, time.perf_counter() - start)
+
+    stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Offline load test for the Gradio app.
+
+Starts the stub OpenAI/YouTube server, launches test.py against it with
+fresh caches, and drives each tab's endpoint at the given concurrency
+levels through gradio_client. Reports p50/p95/p99 latency and requests/s
+per tab and saves the results (plus a /metrics snapshot) as JSON:
+
+    python benchmarks/load_test.py --concurrency 1,8,32 --requests 64
+    python benchmarks/load_test.py --baseline benchmarks/results/previous.json
+
+With --baseline, p95 latency and throughput are compared against an
+earlier run.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from stub_server import start_stub_server
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+
+ITINERARY_INPUTS = (
+    10, ["Space exploration", "Physics and mechanics"], "English", "",
+    "Learn how rockets work", "10:00", "3 hours (recommended)", False,
+)
+
+
+def _scenarios():
+    """
+    Returns {tab: call(client, number)}. Each call makes one request the
+    way the browser would for that tab.
+    """
+    def itinerary(client, number):
+        client.predict(*ITINERARY_INPUTS, api_name="/generate_itinerary")
+
+    def itinerary_audio(client, number):
+        client.predict(f"1. Stub exhibit - narration {number}", api_name="/render_itinerary_audio")
+
+    def companion(client, number):
+        client.predict(f"Why is the sky blue? Question {number}", 10, api_name="/chat")
+
+    def exit_ticket(client, number):
+        client.predict(10, ["The Giant Heart", "Space Command"], "The rockets", api_name="/create_exit_ticket")
+
+    return {
+        "itinerary": itinerary,
+        "itinerary_audio": itinerary_audio,
+        "companion": companion,
+        "exit_ticket": exit_ticket,
+    }
+
+
+def percentile(values, share):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(share * len(ordered)) - 1))]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(stub_url, cache_dir, port, command=("test.py",)):
+    """
+    Launches the app (test.py by default) pointed at the stub server and
+    waits until it serves.
+    """
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="stub",
+        OPENAI_BASE_URL=f"{stub_url}/v1",
+        YOUTUBE_API_KEY="stub",
+        YOUTUBE_API_BASE_URL=f"{stub_url}/youtube/v3",
+        # The stub has no rate limits; keep the scheduler from throttling it
+        MUSEO_RATE_LIMITS="gpt-3.5-turbo=10000000:10000000000,gpt-4o-mini-tts=10000000:10000000000",
+        # Cold caches, so every request reaches the (stub) APIs
+        MUSEO_CACHE_DB=os.path.join(cache_dir, "museo.sqlite3"),
+        MUSEO_AUDIO_CACHE_DIR=os.path.join(cache_dir, "audio"),
+        MUSEO_CHANNEL_INDEX=os.path.join(cache_dir, "channel_index.json"),
+        MUSEO_SEMANTIC_CACHE_THRESHOLD="2",
+        GRADIO_SERVER_NAME="127.0.0.1",
+        GRADIO_SERVER_PORT=str(port),
+        GRADIO_ANALYTICS_ENABLED="False",
+    )
+    process = subprocess.Popen([sys.executable, *command], cwd=REPO_DIR, env=env)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{command[0]} exited with code {process.returncode}")
+        try:
+            urllib.request.urlopen(url, timeout=1)
+            return process, url
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"{command[0]} did not start within 120s")
+
+
+def run_level(url, call, concurrency, requests):
+    """
+    Sends `requests` calls with at most `concurrency` in flight and returns
+    the latency summary.
+    """
+    from gradio_client import Client
+
+    local = threading.local()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def one(number):
+        if not hasattr(local, "client"):
+            local.client = Client(url, verbose=False)
+        start = time.perf_counter()
+        try:
+            call(local.client, number)
+        except Exception as e:
+            with lock:
+                errors.append(f"{e.__class__.__name__}: {e}")
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": len(errors),
+        "sample_errors": sorted(set(errors))[:3],
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "mean": sum(latencies) / len(latencies) if latencies else None,
+    }
+
+
+def _format_seconds(value):
+    return f"{value:.3f}" if value is not None else "-"
+
+
+def report(results, baseline=None):
+    previous = {}
+    for entry in (baseline or {}).get("results", []):
+        previous[(entry["tab"], entry["concurrency"])] = entry
+
+    print(f"{'tab':<16} {'conc':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+    for entry in results:
+        line = (
+            f"{entry['tab']:<16} {entry['concurrency']:>5} {entry['requests_per_second']:>8.1f} "
+            f"{_format_seconds(entry['p50']):>8} {_format_seconds(entry['p95']):>8} "
+            f"{_format_seconds(entry['p99']):>8} {entry['errors']:>7}"
+        )
+        before = previous.get((entry["tab"], entry["concurrency"]))
+        if before and before.get("p95") and entry["p95"] and before["requests_per_second"]:
+            line += (
+                f"   p95 {(entry['p95'] / before['p95'] - 1) * 100:+.0f}%"
+                f" req/s {(entry['requests_per_second'] / before['requests_per_second'] - 1) * 100:+.0f}%"
+            )
+        print(line)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    scenarios = _scenarios()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=64, help="requests per tab and concurrency level")
+    parser.add_argument("--tabs", default=",".join(scenarios), help="comma-separated tabs to drive")
+    parser.add_argument("--latency", type=float, default=0.5, help="stub response time in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of stub responses that fail")
+    parser.add_argument("--output", help="results JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    tabs = [tab.strip() for tab in args.tabs.split(",")]
+    unknown = set(tabs) - set(scenarios)
+    if unknown:
+        parser.error(f"unknown tabs: {', '.join(sorted(unknown))}")
+
+    stub_url, stop_stub = start_stub_server(args.latency, args.error_rate)
+    cache_dir = tempfile.mkdtemp(prefix="museo-load-")
+    process, url = start_app(stub_url, cache_dir, _free_port())
+    results = []
+    try:
+        for tab in tabs:
+            for concurrency in levels:
+                entry = run_level(url, scenarios[tab], concurrency, args.requests)
+                entry["tab"] = tab
+                results.append(entry)
+                print(f"{tab} x{concurrency}: {entry['requests_per_second']:.1f} req/s, p95 {_format_seconds(entry['p95'])}s")
+        with urllib.request.urlopen(f"{url}/metrics", timeout=10) as response:
+            metrics_text = response.read().decode("utf-8")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        stop_stub()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    report(results, baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "config": vars(args),
+            "results": results,
+            "metrics": metrics_text,
+        }, f, indent=2)
+    print(f"results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Cold-start measurement for the app.
+
+Each run starts a fresh interpreter that imports the app module and calls
+create_app(), timing both, and a separate `python -X importtime` run lists
+the modules that dominate import time:
+
+    python benchmarks/startup_time.py --runs 5
+    python benchmarks/startup_time.py --output benchmarks/results/startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURE = """
+import json, time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+factory = getattr({module}, "create_app", None)
+if factory is not None:
+    factory()
+created = time.perf_counter()
+print(json.dumps({{"import": imported - start, "create_app": created - imported if factory else None}}))
+"""
+
+
+def measure_once(module):
+    env = dict(os.environ, GRADIO_ANALYTICS_ENABLED="False")
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE.format(module=module)],
+        cwd=REPO_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def import_profile(module, top):
+    """
+    Returns the total import time of the module and the `top` slowest
+    imports by cumulative time, both in seconds, from -X importtime.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True,
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Two spaces of indentation per nesting level; keep the module
+        # itself and what it imports directly
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            entries.append((depth, name.strip(), int(cumulative) / 1e6))
+    total = next((seconds for depth, name, seconds in entries if depth == 0 and name == module), None)
+    direct = [(name, seconds) for depth, name, seconds in entries if depth == 1]
+    return total, sorted(direct, key=lambda entry: -entry[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="test", help="app module to import")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    runs = [measure_once(args.module) for _ in range(args.runs)]
+    import_seconds = statistics.median(run["import"] for run in runs)
+    create_times = [run["create_app"] for run in runs if run["create_app"] is not None]
+    create_seconds = statistics.median(create_times) if create_times else None
+    importtime_total, slowest = import_profile(args.module, args.top)
+
+    print(f"import {args.module}: {import_seconds:.3f}s (median of {args.runs})")
+    if create_seconds is not None:
+        print(f"create_app(): {create_seconds:.3f}s (median of {args.runs})")
+    print("\nslowest imports (-X importtime, cumulative):")
+    for name, seconds in slowest:
+        print(f"  {seconds:8.3f}s  {name}")
+
+    if args.output:
+        if os.path.dirname(args.output):
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "module": args.module,
+                "runs": runs,
+                "import_seconds": import_seconds,
+                "create_app_seconds": create_seconds,
+                "importtime_total_seconds": importtime_total,
+                "slowest_imports": [{"module": name, "seconds": seconds} for name, seconds in slowest],
+            }, f, indent=2)
+        print(f"results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Local stand-in for the OpenAI and YouTube Data APIs, for benchmarks that
+must not touch the real services. Serves:
+
+- POST /v1/chat/completions (plain and streamed)
+- POST /v1/audio/speech
+- GET /youtube/v3/search
+
+Every response is delayed by a fixed latency, and a share of requests
+(error_rate) fails with a 429 or 500 so retries are exercised too. Reply
+text carries a request counter, so downstream caches see distinct content.
+"""
+import asyncio
+import io
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import wave
+import zlib
+
+from aiohttp import web
+
+STREAM_CHUNKS = 20
+# One second of silence, so the app's audio path handles a real WAV file
+_WAV = io.BytesIO()
+with wave.open(_WAV, "wb") as _w:
+    _w.setnchannels(1)
+    _w.setsampwidth(2)
+    _w.setframerate(24000)
+    _w.writeframes(b"\0\0" * 24000)
+WAV_BYTES = _WAV.getvalue()
+
+
+def _chat_completion(model, content):
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 200, "completion_tokens": 300, "total_tokens": 500},
+    }
+
+
+def _chat_chunk(model, content=None, finish_reason=None, usage=None):
+    chunk = {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [],
+    }
+    if usage is not None:
+        chunk["usage"] = usage
+    else:
+        delta = {"content": content} if content is not None else {}
+        chunk["choices"].append({"index": 0, "delta": delta, "finish_reason": finish_reason})
+    return f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+
+
+def _itinerary_stops(messages):
+    """
+    Returns the number of scheduled stops in an itinerary prompt, or None
+    for other prompts.
+    """
+    content = messages[-1].get("content", "") if messages else ""
+    if "Our schedule:\n" not in content:
+        return None
+    schedule = content.split("Our schedule:\n", 1)[1].split("\n\n", 1)[0]
+    return sum(1 for line in schedule.splitlines() if re.match(r"\d+\. ", line))
+
+
+def _reply_text(number, stops=None):
+    # Itinerary prompts get the JSON lines they ask for
+    if stops is not None:
+        lines = [
+            json.dumps({"stop": stop, "reason": f"Stub explanation {stop} for request {number}."})
+            for stop in range(1, stops + 1)
+        ]
+        lines.append(json.dumps({"tip": f"Stub tip for request {number}."}))
+        return "\n".join(lines)
+    return "\n".join(
+        f"{stop}. Stub exhibit {stop} - stub explanation for request {number}."
+        for stop in range(1, 5)
+    )
+
+
+def create_app(latency, error_rate=0.0, token_interval=0.01):
+    counter = itertools.count(1)
+
+    def injected_error():
+        if random.random() >= error_rate:
+            return None
+        if random.random() < 0.5:
+            return web.json_response(
+                {"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_error"}},
+                status=429,
+                headers={"Retry-After": "0"},
+            )
+        return web.json_response({"error": {"message": "Server error (stub)", "type": "server_error"}}, status=500)
+
+    async def chat_completions(request):
+        body = await request.json()
+        await asyncio.sleep(latency)
+        error = injected_error()
+        if error is not None:
+            return error
+        model = body.get("model", "stub")
+        content = _reply_text(next(counter), _itinerary_stops(body.get("messages")))
+        if not body.get("stream"):
+            return web.json_response(_chat_completion(model, content))
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        step = max(len(content) // STREAM_CHUNKS, 1)
+        for offset in range(0, len(content), step):
+            await response.write(_chat_chunk(model, content[offset:offset + step]))
+            await asyncio.sleep(token_interval)
+        await response.write(_chat_chunk(model, finish_reason="stop"))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            await response.write(_chat_chunk(model, usage={"prompt_tokens": 200, "completion_tokens": 300, "total_tokens": 500}))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def speech(request):
+        await request.json()
+        await asyncio.sleep(latency)
+        error = injected_error()
+        if error is not None:
+            return error
+        return web.Response(body=WAV_BYTES, content_type="audio/wav")
+
+    async def youtube_search(request):
+        query = request.query.get("q", "")
+        await asyncio.sleep(latency)
+        error = injected_error()
+        if error is not None:
+            return error
+        items = [
+            {"id": {"videoId": f"stub{index}{zlib.crc32(query.encode()) % 10000:04d}"}, "snippet": {"title": f"{query} video {index}"}}
+            for index in range(int(request.query.get("maxResults", 3)))
+        ]
+        return web.json_response({"items": items})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/v1/audio/speech", speech)
+    app.router.add_get("/youtube/v3/search", youtube_search)
+    return app
+
+
+def start_stub_server(latency=0.5, error_rate=0.0, host="127.0.0.1", port=0):
+    """
+    Starts the stub server on its own thread and returns (base_url, stop).
+    The OpenAI API is under base_url + "/v1" and YouTube under
+    base_url + "/youtube/v3".
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="stub-server", daemon=True).start()
+
+    async def start():
+        runner = web.AppRunner(create_app(latency, error_rate))
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        return runner, bound_port
+
+    runner, bound_port = asyncio.run_coroutine_threadsafe(start(), loop).result()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+    return f"http://{host}:{bound_port}", stop
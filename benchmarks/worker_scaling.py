@@ -0,0 +1,114 @@
+"""
+Throughput scaling with the number of worker processes.
+
+Runs serve.py against the stub server with 1, 2, 4... workers and drives
+the same tab mix at a fixed concurrency through the sticky proxy, then
+reports requests/s, p95 latency and the speedup over one worker. Each
+worker's own /metrics is read before and after every run, and the run
+fails if some worker served none of the requests, since the speedup would
+then not measure scale-out:
+
+    python benchmarks/worker_scaling.py --workers 1,2,4 --concurrency 64
+
+Results are saved as JSON like load_test.py's.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import urllib.request
+
+from load_test import RESULTS_DIR, _format_seconds, _free_port, _git_commit, _scenarios, run_level, start_app
+from stub_server import start_stub_server
+
+# Tabs whose responses carry no files, so any worker can answer a
+# cookie-less client's follow-up requests
+DEFAULT_TABS = "itinerary,companion,exit_ticket"
+
+
+def served_per_worker(port, workers):
+    """
+    Returns how many requests each worker has finished, read from the
+    workers' own /metrics on the ports serve.py gives them after the proxy's.
+    """
+    counts = []
+    for index in range(workers):
+        with urllib.request.urlopen(f"http://127.0.0.1:{port + 1 + index}/metrics", timeout=10) as response:
+            text = response.read().decode("utf-8")
+        counts.append(int(sum(
+            float(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+            if line.startswith("museo_stage_seconds_count{") and 'stage="total"' in line
+        )))
+    return counts
+
+
+def main():
+    scenarios = _scenarios()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=256, help="requests per tab and worker count")
+    parser.add_argument("--tabs", default=DEFAULT_TABS, help="comma-separated tabs to drive")
+    parser.add_argument("--latency", type=float, default=0.5, help="stub response time in seconds")
+    parser.add_argument("--output", help="results JSON path (default: benchmarks/results/workers-<timestamp>.json)")
+    args = parser.parse_args()
+
+    counts = [int(count) for count in args.workers.split(",")]
+    tabs = [tab.strip() for tab in args.tabs.split(",")]
+    stub_url, stop_stub = start_stub_server(args.latency)
+    results = []
+    unbalanced = []
+    try:
+        for workers in counts:
+            # Every worker count starts from cold caches
+            cache_dir = tempfile.mkdtemp(prefix="museo-workers-")
+            port = _free_port()
+            process, url = start_app(stub_url, cache_dir, port, ("serve.py", "--workers", str(workers), "--port", str(port)))
+            try:
+                for tab in tabs:
+                    before = served_per_worker(port, workers)
+                    entry = run_level(url, scenarios[tab], args.concurrency, args.requests)
+                    served = [after - start for after, start in zip(served_per_worker(port, workers), before)]
+                    entry.update(tab=tab, workers=workers, served_per_worker=served)
+                    results.append(entry)
+                    print(f"{tab} with {workers} workers: {entry['requests_per_second']:.1f} req/s, "
+                          f"p95 {_format_seconds(entry['p95'])}s, {entry['errors']} errors, "
+                          f"served per worker {served}")
+                    if min(served) == 0:
+                        unbalanced.append(f"{tab} with {workers} workers")
+            finally:
+                process.terminate()
+                process.wait(timeout=60)
+                shutil.rmtree(cache_dir, ignore_errors=True)
+    finally:
+        stop_stub()
+
+    single = {entry["tab"]: entry["requests_per_second"] for entry in results if entry["workers"] == counts[0]}
+    print(f"\n{'tab':<16} {'workers':>7} {'req/s':>8} {'p95':>8} {'speedup':>8}")
+    for entry in results:
+        entry["speedup"] = entry["requests_per_second"] / single[entry["tab"]] if single.get(entry["tab"]) else None
+        speedup = f"{entry['speedup']:.2f}x" if entry["speedup"] else "-"
+        print(f"{entry['tab']:<16} {entry['workers']:>7} {entry['requests_per_second']:>8.1f} "
+              f"{_format_seconds(entry['p95']):>8} {speedup:>8}")
+
+    output = args.output or os.path.join(RESULTS_DIR, "workers-" + time.strftime("%Y%m%d-%H%M%S") + ".json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "config": vars(args),
+            "results": results,
+        }, f, indent=2)
+    print(f"results saved to {output}")
+    if unbalanced:
+        print(f"❌ requests did not reach every worker: {'; '.join(unbalanced)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
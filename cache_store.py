@@ -0,0 +1,130 @@
+"""
+Small persistent key/value cache on top of SQLite.
+
+Each cache lives in its own table of a shared database file. Values are
+stored as JSON along with the time they were written and last read, so
+callers can apply their own freshness rules and the table can be bounded
+with least-recently-used eviction. The database runs in WAL mode, so
+several worker processes can share it. RequestLog keeps a timestamped
+event table in the same database for counting recent requests.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_PATH = os.getenv(
+    "MUSEO_CACHE_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "museo.sqlite3"),
+)
+
+
+def _open(db_path):
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=10)
+    # WAL lets every worker process read while another one writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SqliteCache:
+    def __init__(self, table, db_path=DEFAULT_DB_PATH, max_entries=None):
+        self.table = table
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            conn = _open(self.db_path)
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table} (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        """
+        Returns (value, stored_at) for a key, or None if it is not cached.
+        """
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(f"SELECT value, stored_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            if self.max_entries is not None:
+                conn.execute(
+                    f"DELETE FROM {self.table} WHERE key NOT IN "
+                    f"(SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+
+    def delete(self, key):
+        with self._lock:
+            self._connect().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class RequestLog:
+    def __init__(self, table, db_path=DEFAULT_DB_PATH):
+        self.table = table
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            conn = _open(self.db_path)
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT NOT NULL, value TEXT NOT NULL, requested_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_requested ON {self.table} (requested_at)")
+            self._conn = conn
+        return self._conn
+
+    def add(self, key, value):
+        with self._lock:
+            self._connect().execute(
+                f"INSERT INTO {self.table} (key, value, requested_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+
+    def most_common(self, since, limit=None):
+        """
+        Returns [(key, count, value)] for the keys requested since the given
+        time, most requested first. value is the one logged most recently.
+        """
+        with self._lock:
+            # SQLite takes the bare value column from the row with MAX(requested_at)
+            rows = self._connect().execute(
+                f"SELECT key, COUNT(*) AS requests, MAX(requested_at), value FROM {self.table} "
+                "WHERE requested_at >= ? GROUP BY key ORDER BY requests DESC LIMIT ?",
+                (since, -1 if limit is None else limit),
+            ).fetchall()
+        return [(key, count, json.loads(value)) for key, count, _, value in rows]
+
+    def prune(self, before):
+        with self._lock:
+            self._connect().execute(f"DELETE FROM {self.table} WHERE requested_at < ?", (before,))
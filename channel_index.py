@@ -0,0 +1,258 @@
+"""
+Offline index of The Franklin Institute YouTube channel.
+
+The ingest command snapshots the channel's video metadata (titles,
+descriptions, tags, durations) into a local JSON file:
+
+    python channel_index.py ingest
+    python channel_index.py ingest --fixture videos.json
+
+Recommendations are then ranked in-process with BM25 over that snapshot, so
+serving them costs no quota and no network round trip. The live API is only
+used to refresh the snapshot, either from cron or in the background once the
+snapshot is older than MUSEO_CHANNEL_INDEX_MAX_AGE seconds.
+"""
+import argparse
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+if __name__ == "__main__":
+    # Run as a script: settings are read at import time, so load .env first
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+import http_client
+
+CHANNEL_ID = "UCpAQimPOzeu_VRWRs_S4cPw"
+INDEX_PATH = os.getenv(
+    "MUSEO_CHANNEL_INDEX",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "channel_index.json"),
+)
+MAX_AGE = float(os.getenv("MUSEO_CHANNEL_INDEX_MAX_AGE", str(7 * 24 * 3600)))
+API_BASE = os.getenv("YOUTUBE_API_BASE_URL", "https://www.googleapis.com/youtube/v3").rstrip("/")
+
+# Field weights: a query word in the title counts more than one in the description
+FIELD_WEIGHTS = {"title": 3, "tags": 2, "description": 1}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_DURATION_RE = re.compile(r"P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def parse_duration(value):
+    """
+    Converts an ISO 8601 duration such as "PT4M13S" to seconds.
+    """
+    match = _DURATION_RE.fullmatch(value or "")
+    if not match:
+        return 0
+    days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def normalize_video(item):
+    """
+    Accepts either a videos.list item from the YouTube API or an entry in the
+    index's own format and returns an index entry.
+    """
+    if "snippet" not in item:
+        return {
+            "video_id": item["video_id"],
+            "title": item.get("title", ""),
+            "description": item.get("description", ""),
+            "tags": list(item.get("tags", [])),
+            "duration": int(item.get("duration", 0)),
+        }
+    snippet = item["snippet"]
+    return {
+        "video_id": item["id"] if isinstance(item["id"], str) else item["id"]["videoId"],
+        "title": snippet.get("title", ""),
+        "description": snippet.get("description", ""),
+        "tags": snippet.get("tags", []),
+        "duration": parse_duration(item.get("contentDetails", {}).get("duration")),
+    }
+
+
+def _get(path, **params):
+    params["key"] = os.getenv("YOUTUBE_API_KEY")
+    response = http_client.get_requests_session().get(f"{API_BASE}/{path}", params=params, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_channel_videos(channel_id=CHANNEL_ID):
+    """
+    Lists every upload of a channel with its metadata. Uses playlistItems and
+    videos (1 quota unit per page of 50) rather than search (100 per call).
+    """
+    channel = _get("channels", part="contentDetails", id=channel_id)
+    uploads = channel["items"][0]["contentDetails"]["relatedPlaylists"]["uploads"]
+
+    video_ids = []
+    page_token = None
+    while True:
+        params = {"part": "contentDetails", "playlistId": uploads, "maxResults": 50}
+        if page_token:
+            params["pageToken"] = page_token
+        page = _get("playlistItems", **params)
+        video_ids.extend(item["contentDetails"]["videoId"] for item in page.get("items", []))
+        page_token = page.get("nextPageToken")
+        if not page_token:
+            break
+
+    videos = []
+    for i in range(0, len(video_ids), 50):
+        batch = _get("videos", part="snippet,contentDetails", id=",".join(video_ids[i:i + 50]))
+        videos.extend(batch.get("items", []))
+    return videos
+
+
+def ingest(fixture=None, channel_id=CHANNEL_ID, path=INDEX_PATH):
+    """
+    Snapshots the channel's videos, from the API or a local JSON fixture,
+    into the on-disk index. Returns the number of videos indexed.
+    """
+    if fixture is not None:
+        with open(fixture, encoding="utf-8") as f:
+            raw = json.load(f)
+        items = raw["items"] if isinstance(raw, dict) else raw
+    else:
+        items = fetch_channel_videos(channel_id)
+
+    snapshot = {
+        "channel_id": channel_id,
+        "ingested_at": time.time(),
+        "videos": [normalize_video(item) for item in items],
+    }
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return len(snapshot["videos"])
+
+
+class BM25Index:
+    def __init__(self, videos, k1=1.2, b=0.75):
+        self.videos = videos
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.doc_lengths = []
+
+        for doc_id, video in enumerate(videos):
+            counts = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                value = video[field]
+                text = " ".join(value) if isinstance(value, list) else value
+                for token in tokenize(text):
+                    counts[token] += weight
+            for token, tf in counts.items():
+                self.postings[token].append((doc_id, tf))
+            self.doc_lengths.append(sum(counts.values()))
+
+        self.avg_length = sum(self.doc_lengths) / len(self.doc_lengths) if videos else 0
+        n = len(videos)
+        self.idf = {
+            token: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for token, docs in self.postings.items()
+        }
+
+    def search(self, query, k=3):
+        """
+        Returns the top k videos for a query, best match first.
+        """
+        scores = defaultdict(float)
+        for token in set(tokenize(query)):
+            idf = self.idf.get(token)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[token]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [self.videos[doc_id] for doc_id, _ in best]
+
+
+_lock = threading.Lock()
+_index = None
+_index_mtime = None
+_ingested_at = 0
+_refreshing = False
+
+
+def load_index(path=INDEX_PATH):
+    """
+    Returns the in-memory index, reloading it when the snapshot on disk has
+    changed. Returns None if no snapshot has been ingested yet.
+    """
+    global _index, _index_mtime, _ingested_at
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+    with _lock:
+        if mtime != _index_mtime:
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            _index = BM25Index(snapshot["videos"])
+            _index_mtime = mtime
+            _ingested_at = snapshot.get("ingested_at", mtime)
+        return _index
+
+
+def _refresh_if_stale():
+    global _refreshing
+    if time.time() - _ingested_at < MAX_AGE or not os.getenv("YOUTUBE_API_KEY"):
+        return
+    with _lock:
+        if _refreshing:
+            return
+        _refreshing = True
+
+    def refresh():
+        global _refreshing
+        try:
+            ingest()
+        except Exception as e:
+            print(f"Error refreshing channel index: {e}")
+        finally:
+            _refreshing = False
+
+    threading.Thread(target=refresh, name="museo-channel-index", daemon=True).start()
+
+
+def recommend_videos(query, k=3):
+    """
+    Returns up to k (title, video_id) pairs from the local index, or None if
+    no index has been ingested.
+    """
+    index = load_index()
+    if index is None:
+        return None
+    _refresh_if_stale()
+    return [(video["title"], video["video_id"]) for video in index.search(query, k)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the local Franklin Institute video index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = subparsers.add_parser("ingest", help="snapshot the channel's video metadata")
+    ingest_parser.add_argument("--fixture", help="read videos from a local JSON file instead of the API")
+    ingest_parser.add_argument("--channel-id", default=CHANNEL_ID)
+    args = parser.parse_args()
+
+    count = ingest(fixture=args.fixture, channel_id=args.channel_id)
+    print(f"indexed {count} videos into {INDEX_PATH}")
@@ -0,0 +1,185 @@
+"""
+Multi-turn chat with a bounded prompt size.
+
+Each reply is built from the system prompt, a running summary of older
+turns, as many recent turns as fit in the token budget, and the new
+question. Turns that no longer fit are folded into the summary, so the
+prompt stays within budget however long the conversation runs.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import metrics
+import openai_scheduler
+from prompts import MESSAGE_OVERHEAD_TOKENS, count_tokens, messages_tokens
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("MUSEO_CHAT_TOKEN_BUDGET", "1500"))
+SUMMARY_MAX_TOKENS = 200
+
+SUMMARY_PROMPT = (
+    "You keep notes on a conversation between a child and a museum guide chatbot at The Franklin Institute. "
+    "Update the notes with the new turns. Keep the topics the child asked about, what was explained, "
+    "and anything the child said about themselves. Write at most a few short sentences."
+)
+
+
+def trim_to_tokens(text, max_tokens):
+    tokens = count_tokens(text)
+    while text and tokens > max_tokens:
+        text = text[:min(len(text) - 1, len(text) * max_tokens // tokens)]
+        tokens = count_tokens(text)
+    return text
+
+
+def history_to_turns(history):
+    """
+    Converts Gradio chat history, in either "tuples" or "messages" format,
+    into a list of (user, assistant) pairs.
+    """
+    turns = []
+    for entry in history or []:
+        if isinstance(entry, dict):
+            if entry.get("role") == "user":
+                turns.append([entry.get("content") or "", ""])
+            elif entry.get("role") == "assistant" and turns:
+                turns[-1][1] += entry.get("content") or ""
+        else:
+            user, assistant = entry
+            turns.append([user or "", assistant or ""])
+    return [(user, assistant) for user, assistant in turns if isinstance(user, str)]
+
+
+def _turn_messages(turn):
+    user, assistant = turn
+    messages = [{"role": "user", "content": user}]
+    if assistant:
+        messages.append({"role": "assistant", "content": assistant})
+    return messages
+
+
+def _prefix_key(turns):
+    return hashlib.sha256(json.dumps(turns, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ChatEngine:
+    def __init__(self, async_client, system_prompt, model="gpt-3.5-turbo",
+                 token_budget=PROMPT_TOKEN_BUDGET, max_summaries=1000, name="chat"):
+        self.client = async_client
+        # Handler label for this engine's metrics
+        self.name = name
+        self.system_prompt = system_prompt
+        self.model = model
+        self.token_budget = token_budget
+        self.max_summaries = max_summaries
+        # Summaries of conversation prefixes, so each older turn is summarized once
+        self._summaries = OrderedDict()
+
+    def _cached_summary(self, turns):
+        key = _prefix_key(turns)
+        summary = self._summaries.get(key)
+        if summary is not None:
+            self._summaries.move_to_end(key)
+        return summary
+
+    def _remember_summary(self, turns, summary):
+        self._summaries[_prefix_key(turns)] = summary
+        while len(self._summaries) > self.max_summaries:
+            self._summaries.popitem(last=False)
+
+    async def _fold(self, summary, turns):
+        transcript = "\n".join(f"Child: {user}\nGuide: {assistant}" for user, assistant in turns)
+        content = f"Notes so far: {summary or '(none)'}\n\nNew turns:\n{transcript}"
+        with metrics.span(self.name, "summary", self.model):
+            response = await openai_scheduler.achat_completion(
+                self.client,
+                priority=openai_scheduler.PRIORITY_BACKGROUND,
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {"role": "user", "content": trim_to_tokens(content, self.token_budget)},
+                ],
+                max_tokens=SUMMARY_MAX_TOKENS,
+            )
+        metrics.record_usage(self.name, self.model, response.usage)
+        return response.choices[0].message.content
+
+    async def summarize(self, turns):
+        """
+        Returns a running summary of the given turns, extending the longest
+        already-summarized prefix instead of starting over.
+        """
+        if not turns:
+            return ""
+        summary = self._cached_summary(turns)
+        if summary is not None:
+            return summary
+
+        start = len(turns) - 1
+        summary = ""
+        while start > 0:
+            summary = self._cached_summary(turns[:start])
+            if summary is not None:
+                break
+            start -= 1
+        summary = summary or ""
+
+        # Fold the remaining turns in chunks that fit the summary call's budget
+        chunk = []
+        chunk_tokens = 0
+        for index in range(start, len(turns)):
+            cost = messages_tokens(_turn_messages(turns[index]))
+            if chunk and chunk_tokens + cost > self.token_budget // 2:
+                summary = await self._fold(summary, chunk)
+                self._remember_summary(turns[:index], summary)
+                chunk = []
+                chunk_tokens = 0
+            chunk.append(turns[index])
+            chunk_tokens += cost
+        summary = await self._fold(summary, chunk)
+        self._remember_summary(turns, summary)
+        return summary
+
+    async def build_messages(self, user_prompt, history):
+        """
+        Returns (messages, prompt_tokens) for the next reply, keeping the
+        prompt within the token budget.
+        """
+        turns = history_to_turns(history)
+        system = [{"role": "system", "content": self.system_prompt}]
+        summary_allowance = SUMMARY_MAX_TOKENS + MESSAGE_OVERHEAD_TOKENS if turns else 0
+        fixed = messages_tokens(system) + summary_allowance
+        current = [{"role": "user", "content": trim_to_tokens(user_prompt, max(self.token_budget - fixed, 1) // 2)}]
+        remaining = self.token_budget - fixed - messages_tokens(current)
+
+        # Keep the newest turns that fit; everything older goes into the summary
+        recent = []
+        keep = len(turns)
+        for turn in reversed(turns):
+            turn_messages = _turn_messages(turn)
+            cost = messages_tokens(turn_messages)
+            if cost > remaining:
+                break
+            recent = turn_messages + recent
+            remaining -= cost
+            keep -= 1
+
+        messages = list(system)
+        if keep:
+            summary = trim_to_tokens(await self.summarize(turns[:keep]), SUMMARY_MAX_TOKENS - 8)
+            messages.append({"role": "system", "content": f"Earlier in this conversation: {summary}"})
+        messages += recent + current
+        return messages, messages_tokens(messages)
+
+    async def reply(self, user_prompt, history):
+        """
+        Returns the model's reply. Must be awaited on the shared HTTP loop.
+        """
+        messages, prompt_tokens = await self.build_messages(user_prompt, history)
+        # Exported on /metrics, so the budget can be checked in production
+        metrics.chat_prompt_tokens.observe(prompt_tokens, self.name, self.model)
+        with metrics.span(self.name, "llm", self.model):
+            response = await openai_scheduler.achat_completion(self.client, model=self.model, messages=messages)
+        metrics.record_usage(self.name, self.model, response.usage)
+        return response.choices[0].message.content
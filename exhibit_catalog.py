@@ -0,0 +1,171 @@
+"""
+Versioned exhibit catalog with an in-memory index for prompt grounding.
+
+The catalog (data/exhibit_catalog.json) lists every exhibit and show with
+its topics, age range, accessibility, typical dwell time and show times.
+Entries are indexed by interest topic, age and accessibility, and top_k()
+picks only the entries relevant to a request, so prompts carry a few short
+facts instead of leaving the model to recall the museum on its own.
+"""
+import json
+import os
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+CATALOG_PATH = os.getenv(
+    "MUSEO_EXHIBIT_CATALOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "exhibit_catalog.json"),
+)
+
+# Words in free-text expectations mapped to the catalog's accessibility
+# tags. Whole words only, so "situation" or "sites" don't mean "sit".
+ACCESSIBILITY_KEYWORDS = {
+    "wheelchair": "wheelchair",
+    "wheelchairs": "wheelchair",
+    "stroller": "wheelchair",
+    "strollers": "wheelchair",
+    "mobility": "wheelchair",
+    "quiet": "quiet",
+    "quieter": "quiet",
+    "calm": "quiet",
+    "calmer": "quiet",
+    "sensory": "quiet",
+    "autism": "quiet",
+    "autistic": "quiet",
+    "sit": "seated",
+    "sits": "seated",
+    "sitting": "seated",
+    "seat": "seated",
+    "seats": "seated",
+    "seated": "seated",
+}
+# Tags that favour matching entries instead of excluding the others: only
+# shows are seated, and a family that needs to sit still wants exhibits
+PREFERENCE_TAGS = {"seated"}
+
+# Words too common to say anything about which exhibit a question is about
+STOPWORDS = {
+    "a", "about", "an", "and", "are", "at", "be", "can", "did", "do", "does", "for", "from", "how",
+    "i", "if", "in", "is", "it", "me", "my", "of", "on", "or", "so", "tell", "that", "the", "this",
+    "to", "us", "was", "we", "what", "when", "where", "which", "who", "why", "will", "with", "you", "your",
+}
+# A text-only match needs at least this many shared title or topic terms
+MIN_TEXT_SCORE = 1
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def accessibility_needs(text):
+    """
+    Returns the accessibility tags mentioned in free text such as the
+    "Other expectations" field.
+    """
+    words = _WORD_RE.findall((text or "").lower())
+    return sorted({ACCESSIBILITY_KEYWORDS[word] for word in words if word in ACCESSIBILITY_KEYWORDS})
+
+
+def _terms(text):
+    """
+    Returns the content words of a text, with plural "s" dropped.
+    """
+    terms = set()
+    for word in _WORD_RE.findall((text or "").lower()):
+        if word in STOPWORDS:
+            continue
+        terms.add(word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word)
+    return terms
+
+
+class ExhibitCatalog:
+    def __init__(self, data):
+        self.version = data["version"]
+        self.entries = data["entries"]
+        self.by_title = {entry["title"].lower(): entry for entry in self.entries}
+        self.by_topic = defaultdict(list)
+        self.by_accessibility = defaultdict(set)
+        self._words = []
+        # Ages at which the set of suitable entries changes
+        self._age_boundaries = sorted(
+            {entry["min_age"] for entry in self.entries}
+            | {entry["max_age"] + 1 for entry in self.entries if entry.get("max_age") is not None}
+        )
+        for index, entry in enumerate(self.entries):
+            for topic in entry["topics"]:
+                self.by_topic[topic].append(index)
+            for tag in entry.get("accessibility", []):
+                self.by_accessibility[tag].add(index)
+            self._words.append(_terms(" ".join([entry["title"]] + entry["topics"])))
+
+    def get(self, title):
+        return self.by_title.get(title.strip().lower())
+
+    def age_group(self, age):
+        """
+        Returns the lowest age with the same suitable entries as age, so all
+        ages in one group get the same plan. None if age is not a number.
+        """
+        try:
+            age = int(age)
+        except (TypeError, ValueError):
+            return None
+        return max((boundary for boundary in self._age_boundaries if boundary <= age), default=0)
+
+    def matches(self, index, age=None, needs=()):
+        entry = self.entries[index]
+        if age is not None:
+            if age < entry["min_age"] or (entry.get("max_age") is not None and age > entry["max_age"]):
+                return False
+        return all(index in self.by_accessibility[tag] for tag in needs if tag not in PREFERENCE_TAGS)
+
+    def select(self, kind=None, age=None, needs=()):
+        """
+        Returns the entries of a kind ("exhibit" or "show") suitable for the
+        age and accessibility needs, in catalog order.
+        """
+        return [
+            entry for index, entry in enumerate(self.entries)
+            if (kind is None or entry["kind"] == kind) and self.matches(index, age, needs)
+        ]
+
+    def top_k(self, interests=(), text="", age=None, needs=(), k=3):
+        """
+        Returns up to k entries ranked by interest overlap and by title and
+        topic terms shared with the text, restricted to the age and
+        accessibility needs. Entries that match nothing are never returned,
+        so an unrelated question gets no entries at all.
+        """
+        scores = defaultdict(float)
+        for topic in interests:
+            for index in self.by_topic.get(topic, []):
+                scores[index] += 2
+        terms = _terms(text)
+        if terms:
+            for index, entry_terms in enumerate(self._words):
+                shared = len(terms & entry_terms)
+                if shared >= MIN_TEXT_SCORE:
+                    scores[index] += shared
+        ranked = sorted(
+            (index for index in scores if self.matches(index, age, needs)),
+            key=lambda index: (-scores[index], index),
+        )
+        return [self.entries[index] for index in ranked[:k]]
+
+
+def describe(entries):
+    """
+    Formats catalog entries as compact lines for a prompt.
+    """
+    lines = []
+    for entry in entries:
+        details = [", ".join(entry["topics"]), f"ages {entry['min_age']}+", f"about {entry['minutes']} min"]
+        if entry.get("show_times"):
+            details.append("shows at " + ", ".join(entry["show_times"]))
+        lines.append(f"- {entry['title']} ({'; '.join(details)}): {entry.get('summary', '')}")
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=1)
+def load_catalog(path=CATALOG_PATH):
+    with open(path, encoding="utf-8") as f:
+        return ExhibitCatalog(json.load(f))
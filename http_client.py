@@ -0,0 +1,271 @@
+"""
+Process-wide HTTP clients for the OpenAI and YouTube Data APIs.
+
+Every caller shares one long-lived event loop (running on a daemon thread)
+and keep-alive connection pools per host, so repeated TTS renders and video
+searches reuse warm TCP/TLS connections instead of reconnecting each time.
+The AsyncOpenAI client gets an httpx pool sized and counted the same way.
+
+Per-host pool sizes can be overridden with MUSEO_POOL_LIMITS, e.g.
+MUSEO_POOL_LIMITS="api.openai.com=32,www.googleapis.com=8".
+"""
+import asyncio
+import os
+import threading
+
+import metrics
+
+OPENAI_HOST = "api.openai.com"
+YOUTUBE_HOST = "www.googleapis.com"
+THUMBNAIL_HOST = "i.ytimg.com"
+
+
+def _parse_pool_limits(value):
+    limits = {}
+    for entry in value.split(","):
+        if "=" not in entry:
+            continue
+        host, size = entry.split("=", 1)
+        limits[host.strip()] = int(size)
+    return limits
+
+
+POOL_LIMITS = {
+    OPENAI_HOST: 20,
+    YOUTUBE_HOST: 10,
+    THUMBNAIL_HOST: 10,
+    **_parse_pool_limits(os.getenv("MUSEO_POOL_LIMITS", "")),
+}
+DEFAULT_POOL_LIMIT = 10
+KEEPALIVE_TIMEOUT = float(os.getenv("MUSEO_KEEPALIVE_TIMEOUT", "60"))
+
+_lock = threading.Lock()
+_loop = None
+_sessions = {}
+_httpx_clients = {}
+_requests_session = None
+_aiohttp_stats = {}
+
+
+def pool_limit(host):
+    return POOL_LIMITS.get(host, DEFAULT_POOL_LIMIT)
+
+
+def get_loop():
+    """
+    Returns the shared event loop, starting its thread on first use.
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="museo-http", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def submit(coro):
+    """
+    Schedules a coroutine on the shared loop and returns a concurrent future.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro, timeout=None):
+    """
+    Runs a coroutine on the shared loop and blocks until it finishes.
+    """
+    return submit(coro).result(timeout)
+
+
+async def bridge(coro):
+    """
+    Awaits a coroutine on the shared loop from any other event loop, such as
+    the one Gradio runs its handlers on. Cancelling the caller cancels it.
+    """
+    return await asyncio.wrap_future(submit(coro))
+
+
+async def bridge_stream(agen):
+    """
+    Iterates an async generator on the shared loop and yields its items in
+    the caller's event loop.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    finished = object()
+
+    async def pump():
+        try:
+            async for item in agen:
+                loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, (finished, e))
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, (finished, None))
+
+    future = submit(pump())
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is finished:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        future.cancel()
+
+
+def _host_stats(host):
+    return _aiohttp_stats.setdefault(host, {"requests": 0, "new_connections": 0, "reused_connections": 0})
+
+
+def _trace_config(host):
+    from aiohttp import TraceConfig
+
+    stats = _host_stats(host)
+
+    async def on_request_start(session, context, params):
+        stats["requests"] += 1
+
+    async def on_connection_create_end(session, context, params):
+        stats["new_connections"] += 1
+
+    async def on_connection_reuseconn(session, context, params):
+        stats["reused_connections"] += 1
+
+    trace = TraceConfig()
+    trace.on_request_start.append(on_request_start)
+    trace.on_connection_create_end.append(on_connection_create_end)
+    trace.on_connection_reuseconn.append(on_connection_reuseconn)
+    return trace
+
+
+def get_session(host):
+    """
+    Returns the pooled aiohttp session for a host. Must be called from a
+    coroutine running on the shared loop.
+    """
+    from aiohttp import ClientSession, TCPConnector
+
+    session = _sessions.get(host)
+    if session is None or session.closed:
+        connector = TCPConnector(
+            limit=pool_limit(host),
+            limit_per_host=pool_limit(host),
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=300,
+        )
+        session = ClientSession(connector=connector, trace_configs=[_trace_config(host)])
+        _sessions[host] = session
+    return session
+
+
+def get_httpx_client(host):
+    """
+    Returns the pooled httpx client for a host, for SDKs built on httpx such
+    as AsyncOpenAI. Its requests and connections are counted in the host's
+    connection stats.
+    """
+    import httpx
+
+    with _lock:
+        client = _httpx_clients.get(host)
+        if client is None or client.is_closed:
+            stats = _host_stats(host)
+
+            async def on_request(request):
+                stats["requests"] += 1
+                connected = request.extensions["museo_connected"] = []
+
+                # httpcore reports each new TCP connection through this trace
+                async def trace(event, info):
+                    if event == "connection.connect_tcp.complete":
+                        connected.append(True)
+                        stats["new_connections"] += 1
+
+                request.extensions["trace"] = trace
+
+            async def on_response(response):
+                if not response.request.extensions.get("museo_connected", [True]):
+                    stats["reused_connections"] += 1
+
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=pool_limit(host),
+                    max_keepalive_connections=pool_limit(host),
+                    keepalive_expiry=KEEPALIVE_TIMEOUT,
+                ),
+                event_hooks={"request": [on_request], "response": [on_response]},
+                follow_redirects=True,
+            )
+            _httpx_clients[host] = client
+    return client
+
+
+def get_requests_session():
+    """
+    Returns the shared requests session, with a sized keep-alive pool
+    mounted for each configured host.
+    """
+    global _requests_session
+    with _lock:
+        if _requests_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            for host in POOL_LIMITS:
+                session.mount(f"https://{host}/", HTTPAdapter(pool_connections=1, pool_maxsize=pool_limit(host)))
+            _requests_session = session
+    return _requests_session
+
+
+def connection_stats():
+    """
+    Returns request and connection reuse counters per host, covering the
+    aiohttp and httpx pools and the requests pools.
+    """
+    stats = {host: dict(values) for host, values in _aiohttp_stats.items()}
+    if _requests_session is not None:
+        for adapter in set(_requests_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host_stats = stats.setdefault(pool.host, {"requests": 0, "new_connections": 0, "reused_connections": 0})
+                host_stats["requests"] += pool.num_requests
+                host_stats["new_connections"] += pool.num_connections
+                host_stats["reused_connections"] += max(pool.num_requests - pool.num_connections, 0)
+    return stats
+
+
+metrics.register_stats(
+    "museo_http", "Outgoing HTTP", ("host",),
+    lambda: {(host,): stats for host, stats in connection_stats().items()},
+    counters=("requests", "new_connections", "reused_connections"),
+)
+
+
+async def _close_sessions():
+    for session in list(_sessions.values()):
+        await session.close()
+    _sessions.clear()
+    for client in list(_httpx_clients.values()):
+        await client.aclose()
+    _httpx_clients.clear()
+
+
+def close():
+    """
+    Closes all pooled connections. Mainly useful for tests and clean shutdown.
+    """
+    global _requests_session
+    if _loop is not None:
+        run(_close_sessions())
+    with _lock:
+        if _requests_session is not None:
+            _requests_session.close()
+            _requests_session = None
@@ -0,0 +1,102 @@
+"""
+Itinerary cache keyed by a normalized visitor profile.
+
+Most itinerary inputs come from fixed choices, so many families submit the
+same profile. Profiles are normalized before lookup (sorted interests, age
+bands, ETAs rounded up to the half hour, blank free text treated as equal) and
+the generated itinerary is stored in a bounded, persistent LRU cache.
+Requests are also logged by profile, so prewarm.py can generate the most
+common profiles ahead of time.
+"""
+import hashlib
+import json
+import os
+import re
+
+from cache_store import RequestLog, SqliteCache
+from exhibit_catalog import load_catalog
+
+AGE_BANDS = [(5, "0-5"), (8, "6-8"), (11, "9-11"), (14, "12-14"), (17, "15-17")]
+MAX_ENTRIES = int(os.getenv("MUSEO_ITINERARY_CACHE_SIZE", "2000"))
+
+_cache = SqliteCache("itineraries", max_entries=MAX_ENTRIES)
+_requests = RequestLog("itinerary_requests")
+
+
+def age_band(age):
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        return "unknown"
+    for upper, band in AGE_BANDS:
+        if age <= upper:
+            return band
+    return "18+"
+
+
+def round_eta(eta):
+    """
+    Rounds an "HH:MM" arrival time up to the next half hour. Itineraries are
+    planned from the rounded time, so everyone sharing a cached itinerary
+    has arrived by its first stop. Unparseable values are returned stripped
+    so they still compare equal to themselves.
+    """
+    match = re.fullmatch(r"\s*(\d{1,2})[:.h](\d{2})\s*", eta or "")
+    if not match:
+        return (eta or "").strip()
+    minutes = int(match.group(1)) * 60 + int(match.group(2))
+    minutes = (minutes + 29) // 30 * 30
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def normalize_text(text):
+    return " ".join((text or "").split()).lower()
+
+
+def normalize_profile(age, interests, language, expectations,
+                      learning_goals, eta, estimated_staying_time):
+    return {
+        "age": age_band(age),
+        # Ages in one group get the same stops from the planner
+        "age_group": load_catalog().age_group(age),
+        "interests": sorted(interests or []),
+        "language": language,
+        "expectations": normalize_text(expectations),
+        "learning_goals": normalize_text(learning_goals),
+        "eta": round_eta(eta),
+        "estimated_staying_time": estimated_staying_time,
+    }
+
+
+def profile_key(profile):
+    encoded = json.dumps(profile, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def get_itinerary(profile):
+    cached = _cache.get(profile_key(profile))
+    return cached[0] if cached is not None else None
+
+
+def store_itinerary(profile, itinerary):
+    _cache.set(profile_key(profile), itinerary)
+
+
+def record_request(profile, args):
+    """
+    Logs a request for the profile along with the handler arguments it
+    came with, so the profile can be generated again later.
+    """
+    _requests.add(profile_key(profile), {"profile": profile, "args": list(args)})
+
+
+def popular_profiles(since, limit=None):
+    """
+    Returns [(profile, handler arguments, request count)] for the profiles
+    requested since the given time, most requested first.
+    """
+    return [(value["profile"], value["args"], count) for _, count, value in _requests.most_common(since, limit)]
+
+
+def prune_requests(before):
+    _requests.prune(before)
@@ -0,0 +1,134 @@
+"""
+Deterministic visit planner for The Franklin Institute.
+
+Builds a timed plan from the arrival time, visit length, interests, age and
+the exhibit catalog: shows are pinned to their session times first, then
+the gaps are filled with the best-matching exhibits. Every stop ends inside the visit window
+and before closing, so the plan always fits the chosen duration. The LLM
+only narrates the finished plan.
+"""
+import re
+
+from exhibit_catalog import PREFERENCE_TAGS, load_catalog
+
+OPENING_TIME = "09:30"
+CLOSING_TIME = "17:00"
+WALKING_MINUTES = 5
+# An exhibit may be shortened to this share of its usual dwell time to fit a gap
+MIN_DWELL_SHARE = 0.6
+
+DURATION_MINUTES = {
+    "1 hour": 60,
+    "2 hours": 120,
+    "3 hours (recommended)": 180,
+    "4 hours": 240,
+    "> 4 hours": 300,
+}
+
+
+def parse_time(value):
+    """
+    Converts "HH:MM" to minutes after midnight, or None if it can't be parsed.
+    """
+    match = re.fullmatch(r"\s*(\d{1,2})[:.h](\d{2})\s*", value or "")
+    if not match:
+        return None
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+
+def format_time(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _score(item, interests, needs=()):
+    # Preferences such as "seated" favour entries instead of filtering
+    preferred = set(item.get("accessibility", [])) & PREFERENCE_TAGS & set(needs)
+    return 2 * len(set(item["topics"]) & set(interests)) + 2 * len(preferred) + 1
+
+
+def visit_window(eta, estimated_staying_time):
+    """
+    Returns the (start, end) of the visit in minutes after midnight, or None
+    if no time is left between arrival and closing.
+    """
+    arrival = parse_time(eta)
+    opening = parse_time(OPENING_TIME)
+    closing = parse_time(CLOSING_TIME)
+    start = max(arrival if arrival is not None else opening, opening)
+    end = min(start + DURATION_MINUTES.get(estimated_staying_time, 180), closing)
+    return (start, end) if end > start else None
+
+
+def plan_visit(eta, estimated_staying_time, interests, age, needs=()):
+    """
+    Returns a list of stops ordered by start time. Each stop is a dict with
+    title, kind ("exhibit" or "show"), start, end (both "HH:MM"), minutes
+    and topics. Only catalog entries suitable for the age and accessibility
+    needs are used. Returns an empty list if the visit window is empty or
+    nothing in the catalog suits the age and needs.
+    """
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        age = None
+    interests = interests or []
+
+    window = visit_window(eta, estimated_staying_time)
+    if window is None:
+        return []
+    start, end = window
+
+    # Pin the most relevant shows to their earliest session inside the window
+    fixed = []
+    catalog = load_catalog()
+    ranked_shows = sorted(catalog.select("show", age, needs), key=lambda show: -_score(show, interests, needs))
+    for show in ranked_shows:
+        if _score(show, interests, needs) < 3:
+            continue
+        for time_text in show["show_times"]:
+            show_start = parse_time(time_text)
+            show_end = show_start + show["minutes"]
+            if show_start < start or show_end > end:
+                continue
+            if any(show_start < other_end + WALKING_MINUTES and other_start < show_end + WALKING_MINUTES
+                   for other_start, other_end, _ in fixed):
+                continue
+            fixed.append((show_start, show_end, {"title": show["title"], "kind": "show", "topics": show["topics"]}))
+            break
+    fixed.sort(key=lambda stop: stop[0])
+
+    # Fill the gaps around the shows with the best-matching exhibits
+    candidates = sorted(catalog.select("exhibit", age, needs), key=lambda exhibit: -_score(exhibit, interests, needs))
+    stops = []
+    cursor = start
+    for gap_end, next_start, next_stop in [(s, s, stop) for s, _, stop in fixed] + [(end, None, None)]:
+        limit = gap_end - WALKING_MINUTES if next_stop is not None else gap_end
+        while candidates:
+            room = limit - cursor
+            fitting = next(
+                (exhibit for exhibit in candidates if exhibit["minutes"] * MIN_DWELL_SHARE <= room),
+                None,
+            )
+            if fitting is None:
+                break
+            candidates.remove(fitting)
+            minutes = min(fitting["minutes"], room)
+            stops.append((cursor, cursor + minutes, {"title": fitting["title"], "kind": "exhibit", "topics": fitting["topics"]}))
+            cursor += minutes + WALKING_MINUTES
+        if next_stop is not None:
+            show_end = next((e for s, e, stop in fixed if stop is next_stop), next_start)
+            stops.append((next_start, show_end, next_stop))
+            cursor = max(cursor, show_end + WALKING_MINUTES)
+
+    return [
+        dict(stop, start=format_time(stop_start), end=format_time(stop_end), minutes=stop_end - stop_start)
+        for stop_start, stop_end, stop in stops
+    ]
+
+
+def render_plan_markdown(plan):
+    lines = []
+    for number, stop in enumerate(plan, 1):
+        label = " 🎭" if stop["kind"] == "show" else ""
+        lines.append(f"{number}. **{stop['start']}–{stop['end']}** {stop['title']}{label} ({stop['minutes']} min)")
+    return "\n".join(lines)
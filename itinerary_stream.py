@@ -0,0 +1,192 @@
+"""
+Incremental parsing of the structured itinerary explanations.
+
+The itinerary prompt asks for one JSON object per line: {"stop": n,
+"reason": "..."} for each planned stop, then {"tip": "..."}. StopParser
+reads the streamed text object by object and merges each reason with the
+stop's title, start and duration from the local plan, so a stop can be
+shown and its downstream work (TTS, video lookup) started as soon as its
+object is complete, while the reason still being written is shown as it
+streams. Objects may also be pretty-printed, wrapped in one JSON array or
+in a code fence. From the first text that does not follow the format on
+(prose, a malformed or out-of-order object, or an object cut off by the
+token cap), the parser is marked failed: reasons still found in the rest
+are shown as "Number. Title - reason" lines, and prose is kept as written,
+after the stops that did parse.
+"""
+import json
+import re
+
+_STOP_RE = re.compile(r'"stop"\s*:\s*(\d+)')
+# The closing quote is optional so a reason cut off mid-string still matches
+_REASON_RE = re.compile(r'"reason"\s*:\s*"((?:[^"\\]|\\.)*)')
+_TIP_RE = re.compile(r'"tip"\s*:\s*"((?:[^"\\]|\\.)*)')
+_PARTIAL_ESCAPE_RE = re.compile(r"\\(u[0-9a-fA-F]{0,3})?$")
+
+
+def _decode(fragment):
+    """
+    Decodes the contents of a JSON string, which may be cut off.
+    """
+    fragment = _PARTIAL_ESCAPE_RE.sub("", fragment)
+    try:
+        return json.loads(f'"{fragment}"').strip()
+    except ValueError:
+        return fragment.strip()
+
+
+def _object_end(text):
+    """
+    Returns the index just after the JSON object text starts with, or None
+    if the object is not complete yet.
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return index + 1
+    return None
+
+
+class StopParser:
+    def __init__(self, plan):
+        self.plan = plan
+        self.stops = []
+        self.tip = None
+        self.failed = False
+        self._text = ""
+        # Start of the text not parsed yet; it stops moving once failed
+        self._position = 0
+
+    @property
+    def complete(self):
+        """
+        True once every planned stop has parsed and nothing failed.
+        """
+        return not self.failed and len(self.stops) == len(self.plan)
+
+    def feed(self, text):
+        """
+        Adds streamed text and returns the stops it completed.
+        """
+        self._text += text
+        return self._parse(final=False)
+
+    def close(self, truncated=False):
+        """
+        Parses what is left at the end of the stream and returns the stops
+        it completed. An unfinished object, or a stream cut off by the token
+        cap, marks the parser failed.
+        """
+        completed = self._parse(final=True)
+        if truncated:
+            self.failed = True
+        return completed
+
+    def _parse(self, final):
+        completed = []
+        while not self.failed:
+            rest = self._text[self._position:]
+            text = rest.lstrip()
+            skipped = len(rest) - len(text)
+            if not text:
+                break
+            if text.startswith("```"):
+                # Skip the fence line, e.g. ```json
+                end = text.find("\n")
+                if end < 0 and not final:
+                    break
+                self._position += skipped + (len(text) if end < 0 else end + 1)
+                continue
+            if "```".startswith(text) and not final:
+                break
+            if text[0] in "[],":
+                self._position += skipped + 1
+                continue
+            end = _object_end(text) if text[0] == "{" else None
+            if end is None:
+                # Prose, or an object that was cut off
+                if text[0] != "{" or final:
+                    self.failed = True
+                break
+            try:
+                item = json.loads(text[:end])
+            except ValueError:
+                item = None
+            if not self._accept(item, completed):
+                self.failed = True
+                break
+            self._position += skipped + end
+        return completed
+
+    def _accept(self, item, completed):
+        if not isinstance(item, dict):
+            return False
+        if isinstance(item.get("tip"), str) and "stop" not in item:
+            self.tip = item["tip"].strip()
+            return True
+
+        # Stops must arrive in plan order, each with a text reason
+        number = item.get("stop")
+        reason = item.get("reason")
+        if (not isinstance(number, int) or number != len(self.stops) + 1 or number > len(self.plan)
+                or not isinstance(reason, str)):
+            return False
+        stop = dict(self.plan[number - 1], number=number, reason=reason.strip())
+        self.stops.append(stop)
+        completed.append(stop)
+        return True
+
+    def _salvage(self, text):
+        """
+        Renders text that did not parse: the reasons (and tip) found in
+        JSON-like text as stop lines, or prose as written.
+        """
+        lines = []
+        tip = None
+        number = len(self.stops) + 1
+        for chunk in re.split(r"(?=\{)", text):
+            reason = _REASON_RE.search(chunk)
+            if reason:
+                stop = _STOP_RE.search(chunk)
+                number = int(stop.group(1)) if stop else number
+                if len(self.stops) < number <= len(self.plan) and _decode(reason.group(1)):
+                    lines.append(f"{number}. {self.plan[number - 1]['title']} - {_decode(reason.group(1))}")
+                number += 1
+            elif _TIP_RE.search(chunk):
+                tip = _decode(_TIP_RE.search(chunk).group(1))
+        if not lines and tip is None and "{" not in text:
+            return [text.strip()], None
+        return lines, tip
+
+    def markdown(self):
+        """
+        Renders the stops parsed so far as "Number. Title - reason" lines,
+        the format the TTS splitter reads as one item per stop, followed by
+        the reason still being written, so the text streams token by token,
+        and whatever could be recovered from text that did not parse.
+        """
+        lines = [f"{stop['number']}. {stop['title']} - {stop['reason']}" for stop in self.stops]
+        tip = self.tip
+        rest = self._text[self._position:]
+        if self.failed or "{" in rest:
+            salvaged, salvaged_tip = self._salvage(rest)
+            lines += salvaged
+            tip = tip or salvaged_tip
+        if tip:
+            lines.append(f"\n💡 {tip}")
+        return "\n".join(lines).strip()
@@ -0,0 +1,251 @@
+"""
+Latency and token metrics in Prometheus text format.
+
+Pipeline stages and external calls are wrapped in span(), which records
+their duration in a histogram labelled by handler, stage, model and
+outcome ("ok", "error" or "cancelled"). Token usage from OpenAI responses
+is counted per handler and model, and modules that keep their own counters
+(connection reuse, artifact stores, caches, prompts) register them with
+register_stats(). Recording is a lock and a few additions
+per span, so it stays on in production; render() produces the text served
+on /metrics next to the Gradio app.
+"""
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (100, 250, 500, 750, 1000, 1250, 1500, 2000, 3000, 4000, 8000)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # Per label set: [count in each bucket (not cumulative) + overflow, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def total(self, **match):
+        """
+        Returns the sum of the series whose labels have the given values.
+        """
+        with self._lock:
+            values = list(self._values.items())
+        return sum(
+            value for labels, value in values
+            if all(dict(zip(self.label_names, labels)).get(name) == wanted for name, wanted in match.items())
+        )
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Gauge:
+    """
+    Current values, either set() by the code that owns them or read from
+    collect() on every render. collect returns {label values: value}; kind
+    "counter" exposes running totals kept elsewhere.
+    """
+
+    def __init__(self, name, help_text, label_names, collect=None, kind="gauge"):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.collect = collect
+        self.kind = kind
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        if self.collect is not None:
+            try:
+                values = sorted(self.collect().items())
+            except Exception as e:
+                print(f"Error collecting {self.name}: {e}")
+                values = []
+        else:
+            with self._lock:
+                values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+stage_seconds = Histogram(
+    "museo_stage_seconds",
+    "Duration of pipeline stages and external calls.",
+    ("handler", "stage", "model", "outcome"),
+)
+rate_limit_wait_seconds = Histogram(
+    "museo_rate_limit_wait_seconds",
+    "Time OpenAI requests waited for the shared rate limiter.",
+    ("model",),
+)
+llm_tokens = Counter(
+    "museo_llm_tokens_total",
+    "Tokens reported by OpenAI responses.",
+    ("handler", "model", "kind"),
+)
+chat_prompt_tokens = Histogram(
+    "museo_chat_prompt_tokens",
+    "Prompt tokens of each chat reply, to check the history stays within its budget.",
+    ("handler", "model"),
+    buckets=TOKEN_BUCKETS,
+)
+rate_limit_queue_depth = Gauge(
+    "museo_rate_limit_queue_depth",
+    "OpenAI requests waiting for the shared rate limiter.",
+    ("model",),
+)
+openai_retries = Counter(
+    "museo_openai_retries_total",
+    "OpenAI calls retried after a rate limit or a transient failure.",
+    ("model",),
+)
+
+_metrics = [
+    stage_seconds, rate_limit_wait_seconds, rate_limit_queue_depth, openai_retries, llm_tokens, chat_prompt_tokens,
+]
+
+
+def register(metric):
+    """
+    Adds a metric defined in another module to render().
+    """
+    _metrics.append(metric)
+    return metric
+
+
+def register_stats(prefix, help_text, label_names, collect, counters=(), gauges=()):
+    """
+    Exports the fields of a module's own stats on /metrics. collect returns
+    {label values: stats dict}; each field named in counters or gauges
+    becomes a metric read from it on every render.
+    """
+    def field(name):
+        return lambda: {labels: stats[name] for labels, stats in collect().items()}
+
+    for name in counters:
+        register(Gauge(f"{prefix}_{name}_total", f"{help_text} {name.replace('_', ' ')}.",
+                       label_names, collect=field(name), kind="counter"))
+    for name in gauges:
+        register(Gauge(f"{prefix}_{name}", f"{help_text} {name.replace('_', ' ')}.",
+                       label_names, collect=field(name)))
+
+
+class span:
+    """
+    Times a block and records it in museo_stage_seconds:
+
+        with metrics.span("itinerary", "llm", model="gpt-3.5-turbo"):
+            ...
+
+    Works in sync and async code alike.
+    """
+
+    def __init__(self, handler, stage, model=""):
+        self.handler = handler
+        self.stage = stage
+        self.model = model
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            outcome = "ok"
+        elif issubclass(exc_type, (asyncio.CancelledError, GeneratorExit)):
+            outcome = "cancelled"
+        else:
+            outcome = "error"
+        stage_seconds.observe(time.perf_counter() - self.start, self.handler, self.stage, self.model, outcome)
+        return False
+
+
+def record_usage(handler, model, usage):
+    """
+    Counts the prompt and completion tokens of a response's usage, if any.
+    """
+    if usage is None:
+        return
+    llm_tokens.inc(usage.prompt_tokens or 0, handler, model, "prompt")
+    llm_tokens.inc(usage.completion_tokens or 0, handler, model, "completion")
+
+
+def render():
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def metrics_endpoint():
+    """
+    FastAPI route handler serving render() as Prometheus text.
+    """
+    from fastapi.responses import Response
+
+    return Response(render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,250 @@
+"""
+Shared scheduler for every outbound OpenAI call.
+
+Each model gets a token bucket for requests per minute and one for tokens
+per minute. Callers wait in a priority queue until both buckets can cover
+their request, so a burst of visitors is smoothed out instead of turning
+into 429s. Requests that still get rate limited, or hit a transient server
+or connection error, are retried with exponential backoff and full jitter,
+honouring the server's Retry-After (or retry-after-ms) header when it sends
+one. Queue depth, waits and retries are exported on /metrics.
+
+Limits can be overridden with MUSEO_RATE_LIMITS, e.g.
+MUSEO_RATE_LIMITS="gpt-3.5-turbo=3500:160000,gpt-4o-mini-tts=500:100000".
+They are for the whole account; with MUSEO_WORKERS processes, each one
+uses an equal share.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import metrics
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+DEFAULT_LIMITS = {
+    "gpt-3.5-turbo": (3500, 160000),
+    "gpt-4o-mini-tts": (500, 100000),
+}
+FALLBACK_LIMITS = (500, 60000)
+DEFAULT_COMPLETION_TOKENS = 500
+MAX_RETRIES = int(os.getenv("MUSEO_MAX_RETRIES", "5"))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+
+
+def _parse_limits(value):
+    limits = {}
+    for entry in value.split(","):
+        if "=" not in entry:
+            continue
+        model, rates = entry.split("=", 1)
+        rpm, tpm = rates.split(":")
+        limits[model.strip()] = (int(rpm), int(tpm))
+    return limits
+
+
+MODEL_LIMITS = {**DEFAULT_LIMITS, **_parse_limits(os.getenv("MUSEO_RATE_LIMITS", ""))}
+WORKERS = max(int(os.getenv("MUSEO_WORKERS", "1")), 1)
+
+
+class TransientError(Exception):
+    """
+    Raised by callers that talk to the API without the SDK (e.g. TTS over
+    aiohttp) when the response should be retried, such as a 5xx.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimited(TransientError):
+    """
+    A 429 from a caller that talks to the API without the SDK.
+    """
+
+
+def parse_retry_after(headers):
+    """
+    Returns the delay in seconds a response asks for in its retry-after-ms
+    or Retry-After header (seconds or an HTTP date), or None.
+    """
+    try:
+        if headers.get("retry-after-ms"):
+            return max(float(headers["retry-after-ms"]) / 1000, 0.0)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+
+class ModelLimiter:
+    """
+    Grants requests for one model in priority order, as fast as its request
+    and token buckets allow. Lives on the shared HTTP event loop.
+    """
+
+    def __init__(self, model, rpm, tpm):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._timer = None
+
+    async def acquire(self, tokens, priority):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), tokens, time.monotonic(), future))
+        self._dispatch()
+        try:
+            await future
+        finally:
+            if not future.done() or future.cancelled():
+                self._record_depth()
+
+    def _record_depth(self):
+        depth = sum(1 for waiter in self._waiters if not waiter[4].done())
+        metrics.rate_limit_queue_depth.set(depth, self.model)
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiters:
+            priority, _, tokens, queued_at, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            now = time.monotonic()
+            delay = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                break
+            heapq.heappop(self._waiters)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            metrics.rate_limit_wait_seconds.observe(now - queued_at, self.model)
+            future.set_result(None)
+        self._record_depth()
+
+
+_limiters = {}
+
+
+def _limiter(model):
+    limiter = _limiters.get(model)
+    if limiter is None:
+        rpm, tpm = MODEL_LIMITS.get(model, FALLBACK_LIMITS)
+        # Each worker process gets an equal share of the account's limits
+        limiter = _limiters[model] = ModelLimiter(model, max(rpm // WORKERS, 1), max(tpm // WORKERS, 1))
+    return limiter
+
+
+async def acquire(model, tokens, priority=PRIORITY_INTERACTIVE):
+    """
+    Waits until the model's limits allow a request of the given size. Must be
+    awaited on the shared HTTP loop.
+    """
+    await _limiter(model).acquire(tokens, priority)
+
+
+def estimate_tokens(messages=None, text="", max_tokens=None):
+    """
+    Size of a request for the tokens-per-minute limit: prompt tokens plus
+    the expected output.
+    """
+    from prompts import count_tokens, messages_tokens
+
+    prompt_tokens = (count_tokens(text) if text else 0) + messages_tokens(messages or [])
+    return prompt_tokens + (DEFAULT_COMPLETION_TOKENS if max_tokens is None else max_tokens)
+
+
+def _retry_after(error):
+    if isinstance(error, TransientError):
+        return error.retry_after
+    response = getattr(error, "response", None)
+    return parse_retry_after(getattr(response, "headers", None) or {})
+
+
+def _is_retryable(error):
+    if isinstance(error, (TransientError, asyncio.TimeoutError)):
+        return True
+    import aiohttp
+    import openai
+
+    return isinstance(error, (
+        aiohttp.ClientConnectionError, aiohttp.ClientPayloadError,
+        openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError,
+    ))
+
+
+def retry_delay(error, attempt):
+    """
+    Returns how long to wait before retrying: the server's Retry-After when
+    given, otherwise exponential backoff with full jitter.
+    """
+    retry_after = _retry_after(error)
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_CAP)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+async def acall(model, coro_fn, *args, tokens, priority=PRIORITY_INTERACTIVE, **kwargs):
+    """
+    Runs a coroutine function under the model's limits, retrying rate-limited
+    and transient failures. Must be awaited on the shared HTTP loop.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        await acquire(model, tokens, priority)
+        try:
+            return await coro_fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == MAX_RETRIES or not _is_retryable(e):
+                raise
+            delay = retry_delay(e, attempt)
+            metrics.openai_retries.inc(1, model)
+            print(f"{model} call failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def achat_completion(async_client, priority=PRIORITY_INTERACTIVE, **kwargs):
+    """
+    await async_client.chat.completions.create(**kwargs), scheduled and
+    retried. Must be awaited on the shared HTTP loop.
+    """
+    tokens = estimate_tokens(kwargs.get("messages"), max_tokens=kwargs.get("max_tokens"))
+    return await acall(kwargs["model"], lambda: async_client.chat.completions.create(**kwargs), tokens=tokens, priority=priority)
+
@@ -0,0 +1,141 @@
+"""
+Nightly pre-generation of the most requested itinerary profiles.
+
+Ranks the itinerary profiles requested over the last --days days by how
+often they were requested, and generates the itinerary and its audio for
+the most popular ones that are not cached yet. Results go into the shared
+itinerary cache and audio store that generate_itinerary and the audio
+player check first, so common profiles are answered instantly at peak
+hours. Generation stops starting new profiles once --budget chat tokens
+have been spent.
+
+Run it off-peak, e.g. from cron:
+
+    0 3 * * * cd /srv/museo && python prewarm.py --budget 200000
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# Modules below read their settings at import time, so .env is loaded first
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import http_client
+import metrics
+from itinerary_cache import get_itinerary, popular_profiles, prune_requests
+
+DAY = 24 * 3600
+# Request log entries older than this are deleted on every run
+RETENTION_DAYS = int(os.getenv("MUSEO_REQUEST_LOG_DAYS", "30"))
+# Assumed cost of one itinerary until the first ones report their usage
+INITIAL_TOKENS_PER_ITINERARY = 1500
+
+
+def itinerary_tokens():
+    return metrics.llm_tokens.total(handler="itinerary")
+
+
+async def prewarm(candidates, budget, concurrency, audio):
+    """
+    Generates the candidates in order until the token budget would be
+    exceeded. Returns (itineraries generated, audio rendered, failures).
+    """
+    import test
+    from tts import TTS_INSTRUCTIONS, prewarm_speech
+
+    semaphore = asyncio.Semaphore(concurrency)
+    start_tokens = itinerary_tokens()
+    generated = 0
+    rendered = 0
+    failures = 0
+    in_flight = 0
+
+    def spent():
+        return itinerary_tokens() - start_tokens
+
+    def tokens_per_itinerary():
+        return spent() / generated if generated else INITIAL_TOKENS_PER_ITINERARY
+
+    async def one(profile, args, count):
+        nonlocal generated, rendered, failures, in_flight
+        itinerary = await asyncio.to_thread(get_itinerary, profile)
+        try:
+            if itinerary is None:
+                in_flight += 1
+                try:
+                    with metrics.span("prewarm", "itinerary"):
+                        async for itinerary, _ in test._itinerary_updates(*args, True):
+                            pass
+                finally:
+                    in_flight -= 1
+                # Only complete itineraries are cached; don't voice a partial one
+                if await asyncio.to_thread(get_itinerary, profile) is None:
+                    raise RuntimeError("the itinerary was not cached")
+                generated += 1
+            if audio:
+                with metrics.span("prewarm", "tts"):
+                    await prewarm_speech(itinerary, TTS_INSTRUCTIONS)
+                rendered += 1
+        except Exception as e:
+            failures += 1
+            print(f"❌ {profile} ({count} requests) failed: {e.__class__.__name__}: {e}")
+            return
+        print(f"✅ {profile['age']} / {', '.join(profile['interests'])} / {profile['language']} "
+              f"/ {profile['estimated_staying_time']} ({count} requests)")
+
+    tasks = []
+    for profile, args, count in candidates:
+        await semaphore.acquire()
+        # Leave room for the itineraries still being generated
+        if await asyncio.to_thread(get_itinerary, profile) is None and spent() + (in_flight + 1) * tokens_per_itinerary() > budget:
+            semaphore.release()
+            print(f"token budget of {budget} reached")
+            break
+        task = asyncio.ensure_future(one(profile, args, count))
+        task.add_done_callback(lambda _: semaphore.release())
+        tasks.append(task)
+        # Let the task claim its in-flight slot before the next budget check
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    return generated, rendered, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate itineraries for the most requested profiles.")
+    parser.add_argument("--days", type=float, default=7, help="how far back to count requests")
+    parser.add_argument("--top", type=int, default=100, help="most requested profiles to consider")
+    parser.add_argument("--min-requests", type=int, default=2, help="skip profiles requested fewer times")
+    parser.add_argument("--budget", type=int, default=int(os.getenv("MUSEO_PREWARM_TOKEN_BUDGET", "200000")),
+                        help="chat tokens to spend at most")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--no-audio", action="store_true", help="only generate the itinerary text")
+    args = parser.parse_args()
+
+    now = time.time()
+    prune_requests(now - RETENTION_DAYS * DAY)
+    candidates = [
+        candidate for candidate in popular_profiles(now - args.days * DAY, args.top)
+        if candidate[2] >= args.min_requests
+    ]
+    print(f"{len(candidates)} profiles requested at least {args.min_requests} times in the last {args.days:g} days")
+
+    # The handlers live in test.py, which loads Gradio; import it here
+    # rather than on the shared loop
+    import test  # noqa: F401
+
+    start = time.perf_counter()
+    try:
+        generated, rendered, failures = http_client.run(
+            prewarm(candidates, args.budget, max(args.concurrency, 1), not args.no_audio)
+        )
+    finally:
+        http_client.close()
+    print(f"generated {generated} itineraries and {rendered} audio renders in "
+          f"{time.perf_counter() - start:.1f}s using {itinerary_tokens()} tokens, {failures} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Prompt template registry.
+
+Each template is compiled once into a static system message, a static
+instruction prefix for the user message, and a per-visitor suffix. Visitor
+fields only ever appear at the end, so every request for a template starts
+with the same bytes and can hit the provider's prefix cache.
+
+Rendered prompts are measured with a local tokenizer (tiktoken when it is
+installed, otherwise an estimate) and checked against the template's token
+budget: free-text fields are trimmed to fit, and prompts that still don't
+fit are rejected with PromptTooLarge.
+"""
+import os
+import string
+import threading
+from functools import lru_cache
+
+import metrics
+
+TOKENIZER_MODEL = "gpt-3.5-turbo"
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(TOKENIZER_MODEL)
+    except Exception:
+        return None
+
+
+def count_tokens(text):
+    """
+    Returns the number of tokens in the text for the chat model, falling
+    back to about four characters per token without tiktoken.
+    """
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def messages_tokens(messages):
+    return sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+class PromptTooLarge(ValueError):
+    pass
+
+
+class PromptTemplate:
+    def __init__(self, name, system, instructions, fields, token_budget, trimmable=()):
+        self.name = name
+        self.system = system
+        self.instructions = instructions
+        self.fields_template = fields
+        self.token_budget = token_budget
+        self.trimmable = tuple(trimmable)
+        self.field_names = {
+            field for _, field, _, _ in string.Formatter().parse(fields) if field
+        }
+        self._static_tokens = None
+        self.renders = 0
+        self.total_tokens = 0
+        self.max_tokens = 0
+        self.trimmed = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def static_tokens(self):
+        # The static part is measured once; only the visitor fields vary
+        if self._static_tokens is None:
+            self._static_tokens = count_tokens(self.instructions) + (
+                count_tokens(self.system) + MESSAGE_OVERHEAD_TOKENS if self.system else 0
+            ) + MESSAGE_OVERHEAD_TOKENS
+        return self._static_tokens
+
+    def _measure(self, values):
+        return self.static_tokens + count_tokens(self.fields_template.format(**values))
+
+    def render(self, **values):
+        """
+        Returns the chat messages for the given field values, trimming
+        free-text fields if needed to stay within the token budget.
+        """
+        missing = self.field_names - values.keys()
+        if missing:
+            raise KeyError(f"{self.name} prompt is missing fields: {', '.join(sorted(missing))}")
+        values = {name: "" if value is None else str(value) for name, value in values.items()}
+
+        tokens = self._measure(values)
+        trimmed = False
+        while tokens > self.token_budget:
+            longest = max(self.trimmable, key=lambda name: len(values[name]), default=None)
+            if longest is None or not values[longest]:
+                with self._lock:
+                    self.rejected += 1
+                raise PromptTooLarge(f"{self.name} prompt needs {tokens} tokens, budget is {self.token_budget}")
+            values[longest] = values[longest][:len(values[longest]) // 2]
+            trimmed = True
+            tokens = self._measure(values)
+
+        with self._lock:
+            self.renders += 1
+            self.total_tokens += tokens
+            self.max_tokens = max(self.max_tokens, tokens)
+            self.trimmed += trimmed
+
+        messages = []
+        if self.system:
+            messages.append({"role": "system", "content": self.system})
+        messages.append({"role": "user", "content": self.instructions + self.fields_template.format(**values)})
+        return messages
+
+    def stats(self):
+        with self._lock:
+            return {
+                "renders": self.renders,
+                "avg_tokens": self.total_tokens / self.renders if self.renders else 0,
+                "max_tokens": self.max_tokens,
+                "static_tokens": self.static_tokens,
+                "trimmed": self.trimmed,
+                "rejected": self.rejected,
+            }
+
+
+_registry = {}
+
+
+def register(name, system, instructions, fields, token_budget, trimmable=()):
+    template = PromptTemplate(name, system, instructions, fields, token_budget, trimmable)
+    _registry[name] = template
+    return template
+
+
+def get(name):
+    return _registry[name]
+
+
+def render(name, **values):
+    return _registry[name].render(**values)
+
+
+def stats():
+    return {name: template.stats() for name, template in _registry.items()}
+
+
+metrics.register_stats(
+    "museo_prompt", "Prompt", ("template",),
+    lambda: {(name,): template_stats for name, template_stats in stats().items()},
+    counters=("renders", "trimmed", "rejected"),
+    gauges=("avg_tokens", "max_tokens", "static_tokens"),
+)
+
+
+register(
+    "itinerary",
+    system=(
+        "You are an advanced AI working for MuseoGo, a platform dedicated to enhancing museum visits using AI. "
+        "You will speak in the language that the current user provides to you."
+        "Your main task is to explain a museum itinerary for The Franklin Institute that has already been scheduled "
+        "to fit the family's arrival time and staying time. Never add, remove, reorder or re-time stops. "
+        "For each stop, in order, write one line of JSON: {\"stop\": <stop number>, \"reason\": \"<explanation>\"}, "
+        "where the explanation is one or two short sentences. Write nothing else, not even code fences. "
+        "Be explicit about how each stop matches my child's interests, age, and learning goals."
+        "Finish with one more line of JSON with one short tip to make the most of the visit: {\"tip\": \"<tip>\"}."
+        "You are displaying this directly to the user, don't exclaim in response to the prompt."
+        "Don't use the word I and instead use second person. Directly address your users. Don't respond to me with \"Certainly\"."
+    ),
+    instructions=(
+        "I am planning a trip to The Franklin Institute with my child. "
+        "Our schedule and my child's details are below.\n"
+        "Explain why each stop is a good fit for my child.\n"
+        "Please write the explanations in the language given below for the rest of the conversation.\n"
+        "Always format your answer as one JSON object per line:\n"
+        "{\"stop\": 1, \"reason\": \"...\"}\n\n"
+    ),
+    fields=(
+        "Child's Age: {age}\n"
+        "Interests: {interests}\n"
+        "Learning Goals: {learning_goals}\n"
+        "Keep in mind my child's conditions: {expectations}\n\n"
+        "Our schedule:\n{stops}\n\n"
+        "About these stops:\n{stop_facts}\n\n"
+        "Language: {language}\n"
+    ),
+    token_budget=int(os.getenv("MUSEO_ITINERARY_PROMPT_BUDGET", "1200")),
+    trimmable=("learning_goals", "expectations"),
+)
+
+register(
+    "companion",
+    system=(
+        "You are an educational AI chatbot for MuseoGo, designed to answer questions from children visiting "
+        "The Franklin Institute. Your answers must be:\n"
+        "- Age-appropriate (based on the child's age)\n"
+        "- Friendly and engaging 😊\n"
+        "- Factually correct and easy to understand\n"
+        "- Focused on science, exhibits, or museum topics\n"
+        "- Designed to make learning fun and spark curiosity 🧠✨\n\n"
+        "SAFETY GUIDELINES:\n"
+        "- If the input includes hate speech, harmful content, or anything inappropriate, DO NOT answer the question.\n"
+        "- Instead, respond with a kind and firm message like: 'Let's keep things friendly and fun! 😊 I'm here to help with science questions and cool stuff about the museum. If you're curious about something science-y, I'm all ears!'\n"
+        "- Never repeat or acknowledge harmful content directly.\n\n"
+        "Use emojis where helpful to make your responses more fun and relatable.\n"
+        "Always end your answer with a simple multiple-choice question to check understanding."
+    ),
+    instructions=(
+        "Please give a clear, fun explanation that matches my child's age level, and connect it to any "
+        "related exhibit or science concept in the museum when possible.\n\n"
+    ),
+    fields=(
+        "{related_exhibits}"
+        "My child, age {age}, is visiting The Franklin Institute and asks: '{question}'"
+    ),
+    token_budget=int(os.getenv("MUSEO_COMPANION_PROMPT_BUDGET", "700")),
+    trimmable=("question",),
+)
+
+register(
+    "exit_ticket",
+    system=(
+        "You are an AI assistant creating personalized exit tickets for young visitors "
+        "at The Franklin Institute. Your goal is to reinforce learning by summarizing key takeaways "
+        "and providing engaging prompts for reflection. Keep the tone friendly, simple, and age-appropriate. "
+        "Use fun language to celebrate learning and encourage curiosity."
+    ),
+    instructions=(
+        "Create a fun, engaging exit ticket for the visit described below that includes:\n"
+        "- A summary of what they learned (in simple language for their age).\n"
+        "- A playful reflection question.\n"
+        "- A suggested hands-on or creative activity they can try at home to keep learning.\n\n"
+    ),
+    fields=(
+        "A {age}-year-old child visited The Franklin Institute and explored the following topics:\n"
+        "{exhibits}\n\n"
+        "{visited_facts}"
+        "Their favorite part of the visit was: {favorite_part}"
+    ),
+    token_budget=int(os.getenv("MUSEO_EXIT_TICKET_PROMPT_BUDGET", "800")),
+    trimmable=("favorite_part",),
+)
@@ -0,0 +1,107 @@
+"""
+Semantic cache for Learning Companion answers.
+
+Questions are embedded locally with hashed word and character n-grams, so a
+lookup is a single matrix-vector product in NumPy rather than an API call.
+Entries are kept separately per age band, so an answer written for one age
+group is never served to another.
+"""
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+
+EMBEDDING_DIM = 1024
+SIMILARITY_THRESHOLD = float(os.getenv("MUSEO_SEMANTIC_CACHE_THRESHOLD", "0.9"))
+MAX_ENTRIES_PER_BAND = int(os.getenv("MUSEO_SEMANTIC_CACHE_SIZE", "500"))
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _features(text):
+    words = _WORD_RE.findall(text.lower())
+    features = list(words)
+    features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    joined = f" {' '.join(words)} "
+    features += [joined[i:i + 3] for i in range(len(joined) - 2)]
+    return features
+
+
+def embed(text):
+    """
+    Returns a unit-length embedding of the text using the hashing trick.
+    """
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for feature in _features(text):
+        h = zlib.crc32(feature.encode("utf-8"))
+        vector[h % EMBEDDING_DIM] += 1.0 if h & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _Band:
+    def __init__(self, capacity):
+        self.vectors = np.zeros((capacity, EMBEDDING_DIM), dtype=np.float32)
+        self.last_used = np.zeros(capacity, dtype=np.int64)
+        self.questions = [None] * capacity
+        self.answers = [None] * capacity
+        self.size = 0
+
+
+class SemanticCache:
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, max_entries=MAX_ENTRIES_PER_BAND):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._bands = {}
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, band, question):
+        """
+        Returns the cached answer for the most similar question in the age
+        band, or None if nothing scores at or above the threshold.
+        """
+        vector = embed(question)
+        with self._lock:
+            entries = self._bands.get(band)
+            if entries is None or entries.size == 0:
+                self.misses += 1
+                return None
+            similarities = entries.vectors[:entries.size] @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            self._clock += 1
+            entries.last_used[best] = self._clock
+            self.hits += 1
+            return entries.answers[best]
+
+    def store(self, band, question, answer):
+        vector = embed(question)
+        with self._lock:
+            entries = self._bands.get(band)
+            if entries is None:
+                entries = self._bands[band] = _Band(self.max_entries)
+            if entries.size < self.max_entries:
+                slot = entries.size
+                entries.size += 1
+            else:
+                slot = int(np.argmin(entries.last_used))
+            self._clock += 1
+            entries.vectors[slot] = vector
+            entries.last_used[slot] = self._clock
+            entries.questions[slot] = question
+            entries.answers[slot] = answer
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": {band: entries.size for band, entries in self._bands.items()},
+            }
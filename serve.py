@@ -0,0 +1,175 @@
+"""
+Multi-worker server for the Gradio app.
+
+Gradio keeps each session's queue and output files in the process that
+served it, so workers cannot simply share one listening socket. Instead
+this starts several worker processes, each serving create_app() from
+test.py on an internal port, behind a small sticky proxy on the public
+port. A new client is assigned a worker round-robin and pinned to it by
+cookie, so visitors sharing one address (a museum Wi-Fi NAT, a load
+balancer) still spread across workers. Requests without the cookie that
+carry a Gradio session hash are routed by the hash.
+
+Itineraries, YouTube results and TTS audio are cached in the shared SQLite
+database (WAL mode) and audio directory, so every worker reuses the
+others' work. OpenAI rate limits are split evenly between workers.
+
+    python serve.py --workers 4 --port 7860
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+import zlib
+
+WORKER_COOKIE = "museo_worker"
+_next_worker = itertools.count()
+# Headers that describe one connection and must not be forwarded
+HOP_HEADERS = {"connection", "keep-alive", "proxy-connection", "te", "trailer", "transfer-encoding", "upgrade", "host"}
+
+
+def start_worker(index, port, workers):
+    env = dict(os.environ, MUSEO_WORKERS=str(workers))
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "test:create_app", "--factory",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+    )
+
+
+def wait_until_ready(url, process, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"worker {url} exited with code {process.returncode}")
+        try:
+            urllib.request.urlopen(url, timeout=1)
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"worker {url} did not start within {timeout}s")
+
+
+def pick_worker(request, body, workers):
+    """
+    Returns the index of the worker that owns this client's session.
+    """
+    pinned = request.cookies.get(WORKER_COOKIE, "")
+    if pinned.isdigit() and int(pinned) < workers:
+        return int(pinned)
+    session_hash = request.query.get("session_hash")
+    if not session_hash and body and request.content_type == "application/json":
+        try:
+            session_hash = json.loads(body).get("session_hash")
+        except (ValueError, AttributeError):
+            pass
+    if session_hash:
+        return zlib.crc32(session_hash.encode("utf-8")) % workers
+    # The response's cookie pins the client from here on
+    return next(_next_worker) % workers
+
+
+def create_proxy(worker_urls):
+    from aiohttp import ClientSession, ClientTimeout, TCPConnector, web
+
+    async def on_startup(app):
+        # No read timeout: queue updates are long-lived event streams
+        app["session"] = ClientSession(
+            connector=TCPConnector(limit=0),
+            timeout=ClientTimeout(total=None, sock_connect=10),
+            auto_decompress=False,
+        )
+
+    async def on_cleanup(app):
+        await app["session"].close()
+
+    async def forward(request):
+        body = await request.read()
+        index = pick_worker(request, body, len(worker_urls))
+        headers = {name: value for name, value in request.headers.items() if name.lower() not in HOP_HEADERS}
+        # Gradio builds file URLs from the Host header, so keep the public one
+        headers["Host"] = request.host
+        headers["X-Forwarded-For"] = request.remote or ""
+        headers["X-Forwarded-Proto"] = request.scheme
+
+        async with request.app["session"].request(
+            request.method, worker_urls[index] + str(request.rel_url),
+            headers=headers, data=body or None, allow_redirects=False,
+        ) as upstream:
+            response = web.StreamResponse(status=upstream.status, reason=upstream.reason)
+            for name, value in upstream.headers.items():
+                if name.lower() not in HOP_HEADERS:
+                    response.headers.add(name, value)
+            if request.cookies.get(WORKER_COOKIE) != str(index):
+                response.set_cookie(WORKER_COOKIE, str(index), httponly=True, samesite="Lax")
+            await response.prepare(request)
+            async for chunk in upstream.content.iter_any():
+                await response.write(chunk)
+            await response.write_eof()
+            return response
+
+    app = web.Application(client_max_size=100 * 1024 * 1024)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_route("*", "/{tail:.*}", forward)
+    return app
+
+
+async def _restart_dead_workers(processes, ports, workers):
+    while True:
+        await asyncio.sleep(5)
+        for index, process in enumerate(processes):
+            if process.poll() is not None:
+                print(f"worker {index} exited with code {process.returncode}, restarting")
+                processes[index] = start_worker(index, ports[index], workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Gradio app on several worker processes.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default=os.getenv("GRADIO_SERVER_NAME", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("GRADIO_SERVER_PORT", "7860")))
+    parser.add_argument("--worker-base-port", type=int, default=None,
+                        help="first internal worker port (default: public port + 1)")
+    args = parser.parse_args()
+
+    from aiohttp import web
+
+    base_port = args.worker_base_port or args.port + 1
+    ports = [base_port + index for index in range(args.workers)]
+    processes = [start_worker(index, port, args.workers) for index, port in enumerate(ports)]
+    try:
+        worker_urls = [f"http://127.0.0.1:{port}" for port in ports]
+        for url, process in zip(worker_urls, processes):
+            wait_until_ready(url, process)
+        print(f"{args.workers} workers ready, serving on http://{args.host}:{args.port}")
+
+        app = create_proxy(worker_urls)
+
+        async def start_monitor(app):
+            app["monitor"] = asyncio.ensure_future(_restart_dead_workers(processes, ports, args.workers))
+
+        async def stop_monitor(app):
+            app["monitor"].cancel()
+
+        app.on_startup.append(start_monitor)
+        app.on_cleanup.append(stop_monitor)
+        web.run_app(app, host=args.host, port=args.port, print=None)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+if __name__ == "__main__":
+    main()
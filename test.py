@@ -1,151 +1,372 @@
+"""
+MuseoGo Gradio app: itinerary generator, learning companion and exit
+ticket generator for The Franklin Institute.
+
+Importing this module only loads .env; create_app() builds the UI and
+returns the ASGI app, and main() serves it:
+
+    python test.py
+    uvicorn test:create_app --factory
+
+OpenAI clients, TTS, the YouTube client and the semantic cache are only
+loaded on first use, so the server starts accepting requests sooner.
+"""
+# Modules below read their settings at import time, so .env is loaded first
+from dotenv import load_dotenv
+
+load_dotenv()
+
 import gradio as gr
-import openai
-from openai import OpenAI
 import os
-import requests
-from dotenv import load_dotenv
+import http_client
+import metrics
+import openai_scheduler
+import prompts
+import thumbnails
+from exhibit_catalog import accessibility_needs, describe, load_catalog
+from itinerary_planner import CLOSING_TIME, OPENING_TIME, plan_visit, render_plan_markdown, visit_window
+from itinerary_cache import age_band, get_itinerary, normalize_profile, record_request, store_itinerary
+from itinerary_stream import StopParser
 import asyncio
-from openai import AsyncOpenAI
-import tempfile
+import threading
+import time
+from functools import lru_cache
+from html import escape
+
+
+@lru_cache(maxsize=1)
+def get_async_client():
+	from openai import AsyncOpenAI
+
+	# Retries are handled by openai_scheduler, which also honours rate limits.
+	# Chat calls share the api.openai.com pool limit and connection stats.
+	return AsyncOpenAI(
+		api_key=os.getenv("OPENAI_API_KEY"),
+		max_retries=0,
+		http_client=http_client.get_httpx_client(http_client.OPENAI_HOST),
+	)
 
-# Load environment variables from .env file
-load_dotenv()
-# Access the API key
-openai_api_key = os.getenv("OPENAI_API_KEY")
-YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 
+# Cancel functions for in-flight audio renders keyed by Gradio session, so
+# a regenerate or a closed tab can stop the render it no longer needs
+_audio_tasks = {}
 
-client = openai.OpenAI(api_key=openai_api_key)
-async_client = AsyncOpenAI(api_key=openai_api_key)
 
+def _start_audio_task(session, cancel):
+	previous = _audio_tasks.pop(session, None)
+	if previous is not None:
+		previous()
+	_audio_tasks[session] = cancel
 
-async def tts_itinerary(text, instructions, voice="nova"):
-	from aiohttp import ClientSession
 
-	# Use Gradio-safe temp file
-	with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmpfile:
-		output_path = tmpfile.name
+def _finish_audio_task(session, cancel):
+	if _audio_tasks.get(session) is cancel:
+		del _audio_tasks[session]
 
-	url = "https://api.openai.com/v1/audio/speech"
-	headers = {
-		"Authorization": f"Bearer {openai_api_key}",
-		"Content-Type": "application/json"
-	}
-	payload = {
-		"model": "gpt-4o-mini-tts",
-		"input": text,
-		"voice": voice,
-		"instructions": instructions,
-		"response_format": "wav"
-	}
 
-	async with ClientSession() as session:
-		async with session.post(url, headers=headers, json=payload) as resp:
-			if resp.status != 200:
-				error_text = await resp.text()
-				raise Exception(f"TTS failed: {resp.status} - {error_text}")
+async def render_itinerary_audio(itinerary, request: gr.Request):
+	"""
+	Renders the itinerary audio in the background after the text has been
+	shown, and reveals the audio player once the file is ready.
+	"""
+	if not itinerary:
+		return gr.update(value=None, visible=False)
 
-			with open(output_path, "wb") as f:
-				while True:
-					chunk = await resp.content.read(1024)
-					if not chunk:
-						break
-					f.write(chunk)
+	from tts import TTS_INSTRUCTIONS, TTS_MODEL, tts_itinerary
 
-	return output_path
+	# The render runs on the shared HTTP loop; cancelling this future cancels it there
+	task = asyncio.wrap_future(http_client.submit(tts_itinerary(itinerary, TTS_INSTRUCTIONS)))
+	cancel = lambda: task.get_loop().call_soon_threadsafe(task.cancel)
+	_start_audio_task(request.session_hash, cancel)
+	try:
+		with metrics.span("itinerary", "tts", TTS_MODEL):
+			audio_path = await task
+	finally:
+		_finish_audio_task(request.session_hash, cancel)
 
+	return gr.update(value=audio_path, visible=True)
 
 
-def sync_tts_wrapper(text):
-	instructions = (
-		"Voice: Friendly and enthusiastic, like a museum guide talking to kids. "
-		"Tone: Excited, informative, curious. Delivery: Clear and fun."
-	)
-	return asyncio.run(tts_itinerary(text, instructions))
+def show_audio_player(itinerary):
+	return gr.update(value=None, visible=bool(itinerary))
+
+
+async def stream_itinerary_audio(itinerary, request: gr.Request):
+	"""
+	Streams the itinerary audio to the player chunk by chunk as it is
+	synthesized, so playback starts before the download has finished.
+	"""
+	if not itinerary:
+		return
+
+	from tts import TTS_INSTRUCTIONS, TTS_MODEL, stream_speech
+
+	stop = threading.Event()
+	_start_audio_task(request.session_hash, stop.set)
+	stream = http_client.bridge_stream(stream_speech(itinerary, TTS_INSTRUCTIONS))
+	try:
+		with metrics.span("itinerary", "tts_stream", TTS_MODEL):
+			async for chunk in stream:
+				if stop.is_set():
+					break
+				yield chunk
+	finally:
+		# Closing the bridge cancels the download on the shared loop
+		await stream.aclose()
+		_finish_audio_task(request.session_hash, stop.set)
+
+
+def cancel_itinerary_audio(request: gr.Request):
+	cancel = _audio_tasks.pop(request.session_hash, None)
+	if cancel is not None:
+		cancel()
 
 # ✨ Itinerary Generator Logic
-def generate_itinerary(age, interests, language, expectations,
-					   learning_goals, eta, estimated_staying_time):
+# Output tokens per explained stop: one or two sentences plus the JSON
+# around them. Chinese and Arabic take two to three times the tokens of
+# the Latin-script languages for the same sentence.
+DEFAULT_ITINERARY_STOP_TOKENS = 120
+ITINERARY_STOP_TOKENS = {"Chinese": 300, "Arabic": 300}
+
+async def generate_itinerary(age, interests, language, expectations,
+							 learning_goals, eta, estimated_staying_time, use_cache=True):
+	args = (age, interests, language, expectations, learning_goals, eta, estimated_staying_time)
+	# Request counts decide which profiles the nightly prewarm job generates.
+	# SQLite calls run in a thread so a busy database never blocks the loop.
+	try:
+		await asyncio.to_thread(record_request, normalize_profile(*args), args)
+	except Exception as e:
+		print(f"Error logging itinerary request: {e}")
+
+	# The pipeline runs on the shared loop; Gradio's loop only relays the updates
+	with metrics.span("itinerary", "total"):
+		async for update in http_client.bridge_stream(_itinerary_updates(
+				age, interests, language, expectations,
+				learning_goals, eta, estimated_staying_time, use_cache, prefetch=True)):
+			yield update
+
+
+async def _itinerary_updates(age, interests, language, expectations,
+							 learning_goals, eta, estimated_staying_time, use_cache, prefetch=False):
 	print(f"language is {language}")
 
-	system_prompt = (
-		"You are an advanced AI working for MuseoGo, a platform dedicated to enhancing museum visits using AI. "
-		"You will speak in the language that the current user provides to you."
-		"Your main task is to create user-friendly itineraries specifically for The Franklin Institute, "
-		f"Ensure that the expected number of hours for the exhibits sums to {estimated_staying_time} and does not go over that. "
-		"factoring in user profiles (age, interests, learning goals, ETA, and estimated staying time). "
-		"Ensure your responses are accurate, thorough, and easy to understand."
-		"Be explicit about how your recommendation matches my child's interests, age, and learning goals."
-		"Provide complete, detailed recommendations for exhibits and scheduling, integrating daily show times."
-		"You are displaying this directly to the user, don't exclaim in response to the prompt."
-		"Don't use the word I and instead use second person. Directly address your users. Don't respond to me with \"Certainly\"."
+	# Families with the same normalized profile get the same itinerary
+	profile = normalize_profile(age, interests, language, expectations,
+								learning_goals, eta, estimated_staying_time)
+	if use_cache:
+		with metrics.span("itinerary", "cache_lookup"):
+			cached_itinerary = await asyncio.to_thread(get_itinerary, profile)
+		if cached_itinerary is not None:
+			yield cached_itinerary, gr.update(value=None, visible=False)
+			return
+
+	# The schedule is planned locally, so it always fits the visit window. It
+	# starts at the normalized arrival time and the planner picks the same
+	# stops for every age in the profile's age group, so the itinerary fits
+	# every family that shares its cache entry.
+	with metrics.span("itinerary", "plan"):
+		needs = accessibility_needs(expectations)
+		plan = plan_visit(profile["eta"], estimated_staying_time, interests, age, needs)
+	if not plan:
+		if visit_window(profile["eta"], estimated_staying_time) is None:
+			raise gr.Error(
+				f"The Franklin Institute is open {OPENING_TIME}–{CLOSING_TIME}. "
+				"Please choose an arrival time that leaves time for your visit."
+			)
+		raise gr.Error(
+			"We couldn't find exhibits suited to your child's age and needs. "
+			"Please check the age and expectations, or ask our front desk for help planning your visit."
+		)
+
+	schedule = "### 🗓️ Your Schedule\n" + render_plan_markdown(plan)
+	# Show the schedule at once and clear the previous itinerary's audio
+	yield schedule, gr.update(value=None, visible=False)
+
+	stops = "\n".join(
+		f"{number}. {stop['title']} ({stop['kind']}, {stop['minutes']} min)"
+		for number, stop in enumerate(plan, 1)
 	)
+	# Ground the explanations in catalog facts about the planned stops only
+	catalog = load_catalog()
+	stop_facts = describe([catalog.get(stop["title"]) for stop in plan])
+	try:
+		messages = prompts.render(
+			"itinerary",
+			# The itinerary is cached for the whole age band, so the narration
+			# must not mention the exact age
+			age=profile["age"],
+			interests=", ".join(interests or []),
+			learning_goals=learning_goals,
+			expectations=expectations,
+			stops=stops,
+			stop_facts=stop_facts,
+			language=language
+		)
+	except prompts.PromptTooLarge:
+		raise gr.Error("Your learning goals and expectations are too long. Please shorten them and try again.")
+
+	model = "gpt-3.5-turbo"
+	start = time.perf_counter()
+	first_token_at = None
+	finish_reason = None
+	narration = ""
+	itinerary = schedule
+	# Stops are parsed from the stream as they complete. For a visitor
+	# waiting in the UI, each one starts its audio and video prefetch while
+	# the rest is still being written.
+	parser = StopParser(plan)
+	spoken = set()
+	downstream = []
+	try:
+		with metrics.span("itinerary", "llm", model):
+			stream = await openai_scheduler.achat_completion(
+				get_async_client(),
+				model=model,
+				messages=messages,
+				# Short per-stop explanations only; the plan itself costs no output tokens
+				max_tokens=ITINERARY_STOP_TOKENS.get(language, DEFAULT_ITINERARY_STOP_TOKENS) * (len(plan) + 1),
+				stream=True,
+				# The last chunk then carries the token usage
+				stream_options={"include_usage": True}
+			)
+
+			async for chunk in stream:
+				if chunk.usage is not None:
+					metrics.record_usage("itinerary", model, chunk.usage)
+				if not chunk.choices:
+					continue
+				finish_reason = chunk.choices[0].finish_reason or finish_reason
+				delta = chunk.choices[0].delta.content
+				if not delta:
+					continue
+				if first_token_at is None:
+					first_token_at = time.perf_counter()
+					metrics.stage_seconds.observe(first_token_at - start, "itinerary", "first_token", model, "ok")
+					print(f"itinerary time to first token: {first_token_at - start:.2f}s")
+				narration += delta
+				completed = parser.feed(delta)
+				updated = _explain_itinerary(schedule, parser, completed if prefetch else (), spoken, downstream)
+				if updated != itinerary:
+					itinerary = updated
+					yield itinerary, gr.update()
+
+			# A stop cut off by the token cap is shown from what was written
+			completed = parser.close(truncated=finish_reason == "length")
+			updated = _explain_itinerary(schedule, parser, completed if prefetch else (), spoken, downstream)
+			if updated != itinerary:
+				itinerary = updated
+				yield itinerary, gr.update()
+	except BaseException:
+		for task in downstream:
+			task.cancel()
+		raise
+
+	print(f"itinerary total generation time: {time.perf_counter() - start:.2f}s")
+
+	# Only cache an itinerary that explains every stop in the expected format
+	if parser.complete:
+		await asyncio.to_thread(store_itinerary, profile, itinerary)
+	elif narration:
+		print(f"itinerary output not cached: {len(parser.stops)} of {len(plan)} stops parsed, "
+			  f"finish reason {finish_reason}")
+
+
+def _explain_itinerary(schedule, parser, completed, spoken, downstream):
+	"""
+	Returns the itinerary text for the explanations so far and starts the
+	downstream work of the given just-completed stops. Output after the
+	first text that is not in the structured format is shown as recovered
+	by the parser.
+	"""
+	itinerary = f"{schedule}\n\n### ✨ Why These Stops\n{parser.markdown()}"
+	if completed:
+		from tts import TTS_INSTRUCTIONS, prefetch_speech
 
-	user_prompt = (
-		f"I am planning a trip to The Franklin Institute with my child.\n\n"
-		f"Child's Age: {age}\n"
-		f"Interests: {interests}\n"
-		f"Learning Goals: {learning_goals}\n"
-		f"Arrival Time (ETA): {eta}\n"
-		f"Estimated Staying Time: {estimated_staying_time}\n\n"
-		f"Keep in mind my child's conditions: {expectations}\n\n"
-		"Generate a personalized museum itinerary tailored to this information. "
-		"Include:\n"
-		"- Recommended exhibits in order, including why you chose each exhibit.\n"
-		"- Time estimates for each exhibit.\n"
-		"- Integration of daily show schedules.\n"
-		"- Any additional tips to maximize their visit.\n\n"
-		f"Please respond to me in {language} for the rest of the conversation.\n"
-		"Always format your answer as:\n"
-		"\"Number. Title - explanation\"\n"
-	)
+		downstream += prefetch_speech(itinerary, TTS_INSTRUCTIONS, spoken)
+		for stop in completed:
+			if stop["kind"] == "exhibit":
+				downstream.append(asyncio.ensure_future(_prefetch_videos(stop["title"])))
+	return itinerary
 
-	response = client.chat.completions.create(
-		model="gpt-3.5-turbo",
-		messages=[
-			{"role": "system", "content": system_prompt},
-			{"role": "user", "content": user_prompt}
-		]
-	)
 
-	itinerary = response.choices[0].message.content
-	audio_path = sync_tts_wrapper(itinerary)
+async def _prefetch_videos(exhibit):
+	"""
+	Warms the video search cache (and the thumbnails the exit ticket shows)
+	for an exhibit on the itinerary.
+	"""
+	from youtube_search import search_youtube_videos
 
-	return itinerary, gr.update(value=audio_path, visible=True)
+	try:
+		with metrics.span("itinerary", "video_prefetch"):
+			videos = await asyncio.to_thread(search_youtube_videos, exhibit)
+			if VIDEO_EMBEDS == "facade":
+				await asyncio.gather(*[
+					asyncio.to_thread(thumbnails.thumbnail_path, video_id) for _, video_id in videos[:2]
+				])
+	except Exception as e:
+		print(f"Error prefetching videos for {exhibit}: {e}")
 
 
 # ✨ Knowledge Companion Logic
-def answer_question(age, question):
-    system_prompt = (
-        "You are an educational AI chatbot for MuseoGo, designed to answer questions from children visiting "
-        "The Franklin Institute. Your answers must be:\n"
-        "- Age-appropriate (based on the child's age)\n"
-        "- Friendly and engaging 😊\n"
-        "- Factually correct and easy to understand\n"
-        "- Focused on science, exhibits, or museum topics\n"
-        "- Designed to make learning fun and spark curiosity 🧠✨\n\n"
-        "SAFETY GUIDELINES:\n"
-        "- If the input includes hate speech, harmful content, or anything inappropriate, DO NOT answer the question.\n"
-        "- Instead, respond with a kind and firm message like: 'Let's keep things friendly and fun! 😊 I'm here to help with science questions and cool stuff about the museum. If you're curious about something science-y, I'm all ears!'\n"
-        "- Never repeat or acknowledge harmful content directly.\n\n"
-        "Use emojis where helpful to make your responses more fun and relatable.\n"
-        "Always end your answer with a simple multiple-choice question to check understanding."
-    )
+@lru_cache(maxsize=1)
+def get_companion():
+    from chat_engine import ChatEngine
+
+    # Keeps follow-up questions in context while bounding the prompt size
+    return ChatEngine(get_async_client(), prompts.get("companion").system, name="companion")
 
-    user_prompt = (
-        f"My child, age {age}, is visiting The Franklin Institute and asks: '{question}'\n\n"
-        "Please give a clear, fun explanation that matches their age level, and connect it to any related exhibit or science concept in the museum when possible."
-    )
 
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
+@lru_cache(maxsize=1)
+def get_answer_cache():
+    from semantic_cache import SemanticCache
+
+    # Answers to repeated questions, kept separately per age band
+    cache = SemanticCache()
+    metrics.register_stats(
+        "museo_answer_cache", "Learning Companion answer cache", (),
+        lambda: {(): cache.stats()}, counters=("hits", "misses"),
     )
+    metrics.register(metrics.Gauge(
+        "museo_answer_cache_entries", "Learning Companion answers cached per age band.", ("band",),
+        collect=lambda: {(band,): entries for band, entries in cache.stats()["entries"].items()},
+    ))
+    return cache
 
-    return response.choices[0].message.content
+
+async def answer_question(question, history, age=10):
+    with metrics.span("companion", "total"):
+        return await _answer_question(question, history, age)
+
+
+async def _answer_question(question, history, age):
+    # Only the few exhibits related to the question go into the prompt
+    try:
+        child_age = int(age)
+    except (TypeError, ValueError):
+        child_age = None
+    with metrics.span("companion", "retrieval"):
+        related = load_catalog().top_k(text=question, age=child_age, k=3)
+    related_exhibits = f"Related exhibits at the museum:\n{describe(related)}\n\n" if related else ""
+
+    try:
+        user_prompt = prompts.render(
+            "companion", related_exhibits=related_exhibits, age=age, question=question
+        )[-1]["content"]
+    except prompts.PromptTooLarge:
+        raise gr.Error("That question is too long for me. Could you ask it in fewer words?")
+
+    # Opening questions repeat all day; follow-ups depend on the conversation
+    band = age_band(age)
+    if not history:
+        with metrics.span("companion", "semantic_cache"):
+            cached_answer = get_answer_cache().lookup(band, question)
+        if cached_answer is not None:
+            return cached_answer
+
+    answer = await http_client.bridge(get_companion().reply(user_prompt, history))
+    if not history:
+        get_answer_cache().store(band, question, answer)
+    return answer
 
 
 
@@ -153,30 +374,31 @@ def answer_question(age, question):
 
 # ✨ Exit Ticket Generator Logic
 
-def generate_exit_ticket(age, exhibits, favorite_part):
-    system_prompt = (
-        "You are an AI assistant creating personalized exit tickets for young visitors "
-        "at The Franklin Institute. Your goal is to reinforce learning by summarizing key takeaways "
-        "and providing engaging prompts for reflection. Keep the tone friendly, simple, and age-appropriate. "
-        "Use fun language to celebrate learning and encourage curiosity."
-    )
+async def generate_exit_ticket(age, exhibits, favorite_part):
+    # Ground the summary in catalog facts about the exhibits they visited
+    catalog = load_catalog()
+    visited = exhibits.split(",") if isinstance(exhibits, str) else exhibits or []
+    visited_entries = [entry for entry in (catalog.get(title) for title in visited) if entry is not None]
+    visited_facts = f"About these exhibits:\n{describe(visited_entries)}\n\n" if visited_entries else ""
 
-    user_prompt = (
-        f"A {age}-year-old child visited The Franklin Institute and explored the following topics:\n"
-        f"{exhibits}\n\n"
-        f"Their favorite part of the visit was: {favorite_part}\n\n"
-        "Create a fun, engaging exit ticket that includes:\n"
-        "- A summary of what they learned (in simple language for their age).\n"
-        "- A playful reflection question.\n"
-        "- A suggested hands-on or creative activity they can try at home to keep learning."
-    )
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
-    )
+    try:
+        messages = prompts.render(
+            "exit_ticket",
+            age=age,
+            exhibits=exhibits,
+            visited_facts=visited_facts,
+            favorite_part=favorite_part
+        )
+    except prompts.PromptTooLarge:
+        raise gr.Error("That is a lot to fit on one exit ticket. Please pick fewer exhibits.")
+    model = "gpt-3.5-turbo"
+    with metrics.span("exit_ticket", "llm", model):
+        response = await openai_scheduler.achat_completion(
+            get_async_client(),
+            model=model,
+            messages=messages
+        )
+    metrics.record_usage("exit_ticket", model, response.usage)
     
     return response.choices[0].message.content
 
@@ -209,96 +431,55 @@ def generate_exit_ticket(age, exhibits, favorite_part):
 # """
 #     return exit_ticket_content
 
-def search_youtube_videos(query, CHANNEL_ID="UCpAQimPOzeu_VRWRs_S4cPw"):
-    """
-    Searches YouTube videos from The Franklin Institute channel based on a query
-    and returns relevant videos with their URLs.
-    """
-    base_url = "https://www.googleapis.com/youtube/v3/search"
-    params = {
-        "key": YOUTUBE_API_KEY,
-        "channelId": CHANNEL_ID,
-        "part": "snippet",
-        "q": query,
-        "maxResults": 3,
-        "order": "relevance",
-        "type": "video"
-    }
-
-    try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        results = []
-        for item in data.get("items", []):
-            video_id = item["id"]["videoId"]
-            title = item["snippet"]["title"]
-            # url = f"https://www.youtube.com/watch?v={video_id}"
-            results.append((title, video_id))
-
-        return results
-    except Exception as e:
-        print(f"Error searching YouTube videos: {e}")
-        return []
-
-
-
-def format_embedded_videos(video_data):
+# "facade" shows a cached thumbnail and loads the YouTube player only when
+# tapped; "iframe" embeds every player up front
+VIDEO_EMBEDS = os.getenv("MUSEO_VIDEO_EMBEDS", "facade")
+
+# Swaps a facade for the player; autoplay so one tap starts the video
+VIDEO_FACADE_ONCLICK = (
+	"var f=document.createElement('iframe');"
+	"f.src='https://www.youtube.com/embed/'+this.dataset.videoId+'?autoplay=1';"
+	"f.title=this.dataset.title;"
+	"f.allow='accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture';"
+	"f.allowFullscreen=true;"
+	"this.replaceWith(f);"
+)
+
+def format_embedded_videos(video_data, embeds=None):
 	"""
 	Accepts a list of (title, video_id) and returns HTML with videos
-	in a responsive grid layout that adapts to screen size.
+	in a responsive grid layout that adapts to screen size. The grid is
+	styled by VIDEO_CSS, which the page includes once.
 	"""
 	if not video_data:
 		return ""
 
-	html = '''
-	<style>
-		.video-grid {
-			display: flex;
-			flex-wrap: wrap;
-			gap: 20px;
-			justify-content: space-between;
-		}
-		.video-item {
-			flex: 1 1 45%;
-			min-width: 300px;
-		}
-		.video-container {
-			position: relative;
-			padding-bottom: 56.25%; /* 16:9 ratio */
-			height: 0;
-			overflow: hidden;
-		}
-		.video-container iframe {
-			position: absolute;
-			top: 0;
-			left: 0;
-			width: 100%;
-			height: 100%;
-			border: 0;
-		}
-		@media (max-width: 600px) {
-			.video-item {
-				flex: 1 1 100%;
-			}
-		}
-	</style>
-	<div class="video-grid">
-	'''
+	embeds = embeds or VIDEO_EMBEDS
+	html = '<div class="video-grid">'
 
 	for title, video_id in video_data:
-		html += f"""
-		<div class="video-item">
-			<h4>🎥 {title}</h4>
-			<div class="video-container">
+		title = escape(title)
+		video_id = escape(video_id)
+		if embeds == "iframe":
+			player = f"""
 				<iframe
 					src="https://www.youtube.com/embed/{video_id}"
 					title="{title}"
 					allow="accelerometer; autoplay; clipboard-write;
 					encrypted-media; gyroscope; picture-in-picture"
 					allowfullscreen>
-				</iframe>
+				</iframe>"""
+		else:
+			player = f"""
+				<button type="button" class="video-facade" data-video-id="{video_id}" data-title="{title}"
+					aria-label="Play {title}" onclick="{VIDEO_FACADE_ONCLICK}">
+					<img src="/thumbnails/{video_id}.jpg" alt="" loading="lazy" decoding="async">
+					<span class="video-play">▶</span>
+				</button>"""
+		html += f"""
+		<div class="video-item">
+			<h4>🎥 {title}</h4>
+			<div class="video-container">{player}
 			</div>
 		</div>
 		"""
@@ -307,9 +488,57 @@ def format_embedded_videos(video_data):
 	return html
 
 
-def create_exit_ticket(age, exhibits, favorite_part):
+# Exit ticket stages run concurrently; a slow video lookup is dropped rather
+# than holding up the ticket
+EXIT_TICKET_TEXT_DEADLINE = float(os.getenv("MUSEO_EXIT_TICKET_TEXT_DEADLINE", "30"))
+EXIT_TICKET_VIDEO_DEADLINE = float(os.getenv("MUSEO_EXIT_TICKET_VIDEO_DEADLINE", "3"))
+
+
+async def create_exit_ticket(age, exhibits, favorite_part):
+	with metrics.span("exit_ticket", "total"):
+		return await http_client.bridge(_build_exit_ticket(age, exhibits, favorite_part))
+
+
+async def _search_videos(exhibit):
+	from youtube_search import search_youtube_videos
+
+	with metrics.span("exit_ticket", "videos"):
+		return await asyncio.to_thread(search_youtube_videos, exhibit)
+
+
+async def _build_exit_ticket(age, exhibits, favorite_part):
+	# Get exhibits as a list
+	exhibits_list = [
+		ex.strip() for ex in
+		(exhibits.split(",") if isinstance(exhibits, str) else exhibits)
+	]
+
+	# Start the exit ticket text and every video lookup at the same time
+	start = time.monotonic()
+	text_task = asyncio.ensure_future(generate_exit_ticket(age, exhibits, favorite_part))
+	video_tasks = [
+		asyncio.ensure_future(_search_videos(exhibit))
+		for exhibit in exhibits_list[:3]  # Limit to 3 exhibits
+	]
+
 	# Generate the exit ticket content - plain text
-	exit_ticket_text = generate_exit_ticket(age, exhibits, favorite_part)
+	try:
+		exit_ticket_text = await asyncio.wait_for(text_task, EXIT_TICKET_TEXT_DEADLINE)
+	except asyncio.TimeoutError:
+		for task in video_tasks:
+			task.cancel()
+		raise gr.Error("Creating your exit ticket is taking too long. Please try again.")
+
+	# Render with whatever videos arrived before their deadline
+	if video_tasks:
+		await asyncio.wait(video_tasks, timeout=max(0, start + EXIT_TICKET_VIDEO_DEADLINE - time.monotonic()))
+	video_results = []
+	for task in video_tasks:
+		if task.done() and not task.cancelled() and task.exception() is None:
+			video_results.append(task.result())
+		else:
+			task.cancel()
+			video_results.append([])
 
 	# Format the text into HTML-friendly format (replace newlines with <br>)
 	formatted_text = exit_ticket_text.replace('\n', '<br>')
@@ -322,12 +551,6 @@ def create_exit_ticket(age, exhibits, favorite_part):
 	</div>
 	"""
 
-	# Get exhibits as a list
-	exhibits_list = [
-		ex.strip() for ex in
-		(exhibits.split(",") if isinstance(exhibits, str) else exhibits)
-	]
-
 	# Prepare embedded video section
 	video_section = """
 	<div style="margin-top: 40px;">
@@ -335,12 +558,12 @@ def create_exit_ticket(age, exhibits, favorite_part):
 	"""
 	video_urls = []
 
-	for i, exhibit in enumerate(exhibits_list[:3]):  # Limit to 3 exhibits
-		videos = search_youtube_videos(exhibit)
+	for i, (exhibit, videos) in enumerate(zip(exhibits_list, video_results)):
 		if videos:
 			if i < 2:  # Only embed for first 2 exhibits
 				video_section += f"<h3>About {exhibit}:</h3>"
-				video_section += format_embedded_videos(videos[:2])
+				with metrics.span("exit_ticket", "html"):
+					video_section += format_embedded_videos(videos[:2])
 			video_urls.append(videos[0][1])  # Store first video ID
 
 	# Pad with None if fewer than 3
@@ -366,111 +589,247 @@ body, .gradio-container {
 }
 """
 
-with gr.Blocks(title="Museum Experience", css=css) as demo:
-    gr.Markdown("# 🏛️ Museum Experience")
+# Styles for format_embedded_videos, included once in the page CSS rather
+# than repeated in every exit ticket
+VIDEO_CSS = """
+.video-grid {
+    display: flex;
+    flex-wrap: wrap;
+    gap: 20px;
+    justify-content: space-between;
+}
+.video-item {
+    flex: 1 1 45%;
+    min-width: 300px;
+}
+.video-container {
+    position: relative;
+    padding-bottom: 56.25%; /* 16:9 ratio */
+    height: 0;
+    overflow: hidden;
+}
+.video-container iframe, .video-facade {
+    position: absolute;
+    top: 0;
+    left: 0;
+    width: 100%;
+    height: 100%;
+    border: 0;
+}
+.video-facade {
+    padding: 0;
+    cursor: pointer;
+    background: #000;
+}
+.video-facade img {
+    width: 100%;
+    height: 100%;
+    object-fit: cover;
+}
+.video-play {
+    position: absolute;
+    top: 50%;
+    left: 50%;
+    transform: translate(-50%, -50%);
+    padding: 8px 20px;
+    border-radius: 12px;
+    background: rgba(0, 0, 0, 0.7);
+    color: #fff;
+    font-size: 28px;
+}
+@media (max-width: 600px) {
+    .video-item {
+        flex: 1 1 100%;
+    }
+}
+"""
+
+def build_demo():
+    """
+    Builds the Gradio Blocks UI with its event queue configured.
+    """
+    from tts import TTS_STREAMING
+    from youtube_search import EXHIBITS
+
+    with gr.Blocks(title="Museum Experience", css=css + VIDEO_CSS) as demo:
+        gr.Markdown("# 🏛️ Museum Experience")
     
-    with gr.Tabs() as tabs:
-        with gr.Tab("Itinerary Generator", id=0):
-            # Kid Information Section
-            with gr.Group():
-                gr.Markdown("## 👶 Kid Information")
-                age = gr.Number(label="Age", value=10, precision=0)
-                interests = gr.CheckboxGroup(
-                    label="What are the interested topics of your kids? (Select at least one)",
-                    choices=["Space exploration", "Human biology", "Technology and innovation", 
-                            "Physics and mechanics", "Environmental science", "History of science"]
-                )
-                learning_goals = gr.Textbox(
-                    label="Learning Goals",
-                    placeholder="What do you hope your child will learn from this visit?"
-                )
+        with gr.Tabs() as tabs:
+            with gr.Tab("Itinerary Generator", id=0):
+                # Kid Information Section
+                with gr.Group():
+                    gr.Markdown("## 👶 Kid Information")
+                    age = gr.Number(label="Age", value=10, precision=0)
+                    interests = gr.CheckboxGroup(
+                        label="What are the interested topics of your kids? (Select at least one)",
+                        choices=["Space exploration", "Human biology", "Technology and innovation", 
+                                "Physics and mechanics", "Environmental science", "History of science"]
+                    )
+                    learning_goals = gr.Textbox(
+                        label="Learning Goals",
+                        placeholder="What do you hope your child will learn from this visit?"
+                    )
             
-            # Visit Information Section
-            with gr.Group():
-                gr.Markdown("## 🕒 Visit Information")
-                eta = gr.Textbox(
-                    label="Estimated arrival time",
-                    placeholder="Enter time between 9:00 and 17:00",
-                    value="12:00",
-                )
-                estimated_staying_time = gr.Radio(
-                    label="Duration",
-                    choices=["1 hour", "2 hours", "3 hours (recommended)", "4 hours", "> 4 hours"],
-                    value="3 hours (recommended)"
-                )
-                language = gr.Radio(
-                    label="Language preference",
-                    choices=["English", "Spanish", "French", "Chinese", "Arabic"],
-                    value="English"
-                )
-                expectations = gr.Textbox(
-                    label="Other expectations (Optional)",
-                    placeholder="E.g., wheelchair accessibility, quiet areas...",
-                    lines=3
-                )
+                # Visit Information Section
+                with gr.Group():
+                    gr.Markdown("## 🕒 Visit Information")
+                    eta = gr.Textbox(
+                        label="Estimated arrival time",
+                        placeholder="Enter time between 9:00 and 17:00",
+                        value="12:00",
+                    )
+                    estimated_staying_time = gr.Radio(
+                        label="Duration",
+                        choices=["1 hour", "2 hours", "3 hours (recommended)", "4 hours", "> 4 hours"],
+                        value="3 hours (recommended)"
+                    )
+                    language = gr.Radio(
+                        label="Language preference",
+                        choices=["English", "Spanish", "French", "Chinese", "Arabic"],
+                        value="English"
+                    )
+                    expectations = gr.Textbox(
+                        label="Other expectations (Optional)",
+                        placeholder="E.g., wheelchair accessibility, quiet areas...",
+                        lines=3
+                    )
+                    use_cached_itinerary = gr.Checkbox(
+                        label="Reuse a saved itinerary for the same profile when available",
+                        value=True
+                    )
                     
-                itinerary_output = gr.Markdown()
-                tts_audio_output = gr.Audio(label="🎧 Listen to Itinerary", visible=False)
-
-                generate_btn = gr.Button("Generate Itinerary", variant="primary")
-                generate_btn.click(
-                    fn=generate_itinerary,
-                    inputs=[age, interests, language, expectations, learning_goals, eta, estimated_staying_time],
-                    outputs=[itinerary_output, tts_audio_output]
-                )
+                    itinerary_output = gr.Markdown()
+                    tts_audio_output = gr.Audio(
+                        label="🎧 Listen to Itinerary",
+                        visible=False,
+                        streaming=TTS_STREAMING,
+                        autoplay=TTS_STREAMING
+                    )
+
+                    generate_btn = gr.Button("Generate Itinerary", variant="primary")
+                    # Audio is rendered after the text is shown, off the critical path,
+                    # and only for an itinerary that was actually generated
+                    itinerary_event = generate_btn.click(
+                        fn=generate_itinerary,
+                        inputs=[age, interests, language, expectations, learning_goals, eta, estimated_staying_time, use_cached_itinerary],
+                        outputs=[itinerary_output, tts_audio_output],
+                        api_name="generate_itinerary"
+                    )
+                    if TTS_STREAMING:
+                        # Show the player first so it can play chunks as they arrive
+                        audio_event = itinerary_event.success(
+                            fn=show_audio_player,
+                            inputs=[itinerary_output],
+                            outputs=tts_audio_output,
+                            show_api=False
+                        ).then(
+                            fn=stream_itinerary_audio,
+                            inputs=[itinerary_output],
+                            outputs=tts_audio_output,
+                            concurrency_limit=None,
+                            api_name="render_itinerary_audio"
+                        )
+                    else:
+                        audio_event = itinerary_event.success(
+                            fn=render_itinerary_audio,
+                            inputs=[itinerary_output],
+                            outputs=tts_audio_output,
+                            concurrency_limit=None,
+                            api_name="render_itinerary_audio"
+                        )
+                    # Regenerating drops the render for the previous itinerary
+                    generate_btn.click(fn=None, cancels=[audio_event])
             
         
-        with gr.Tab("Learning Companion", id=1):
-            chatbot = gr.Chatbot(
-            avatar_images=(None, "museo.png"),
-            show_copy_button=True,
-            height="75vh",
-            show_label=True,
-            container=True
-            )
+            with gr.Tab("Learning Companion", id=1):
+                chatbot = gr.Chatbot(
+                avatar_images=(None, "museo.png"),
+                show_copy_button=True,
+                height="75vh",
+                show_label=True,
+                container=True
+                )
     
-        # Create the chat interface with supported parameters
-            chat_interface = gr.ChatInterface(
-                fn=answer_question,
-                chatbot=chatbot,
-                examples=[
-                    "Why is the sky blue?",
-                    "What is a black hole?",
-                    "What makes a rainbow?"
-                ],
-                additional_inputs=None,
-                submit_btn=True,
-                fill_height=True
-            )
-
-
-        with gr.Tab("Exit Ticket Generator", id=2):
-            gr.Markdown("# 🏛️ Franklin Institute Exit Ticket Generator")
-            gr.Markdown("Create personalized exit tickets for young visitors with learning summaries and video recommendations!")
+            # Create the chat interface with supported parameters
+                chat_interface = gr.ChatInterface(
+                    fn=answer_question,
+                    chatbot=chatbot,
+                    # With additional inputs, each example also carries a value for age
+                    examples=[
+                        ["Why is the sky blue?", 10],
+                        ["What is a black hole?", 10],
+                        ["What makes a rainbow?", 10]
+                    ],
+                    additional_inputs=[age],
+                    submit_btn=True,
+                    fill_height=True
+                )
+
+
+            with gr.Tab("Exit Ticket Generator", id=2):
+                gr.Markdown("# 🏛️ Franklin Institute Exit Ticket Generator")
+                gr.Markdown("Create personalized exit tickets for young visitors with learning summaries and video recommendations!")
             
-            exhibits = gr.CheckboxGroup(
-                label="What exhibitions did you visit today? (Select at least one)",
-                choices=["The Giant Heart" , "Your Brain" , "Changing Earth" , "Space Command" , "The Train Factory" , "Sir Isaac's Loft" , "SportsZone"],
-                interactive=True
-            )
-            favorite_part = gr.Textbox(
-                label="What is your favorite exhibition?",
-                placeholder="E.g., Space Exploration",
-                lines=3
-            )
+                exhibits = gr.CheckboxGroup(
+                    label="What exhibitions did you visit today? (Select at least one)",
+                    choices=EXHIBITS,
+                    interactive=True
+                )
+                favorite_part = gr.Textbox(
+                    label="What is your favorite exhibition?",
+                    placeholder="E.g., Space Exploration",
+                    lines=3
+                )
             
-            generate_btn = gr.Button("Generate Exit Ticket", variant="primary")
+                generate_btn = gr.Button("Generate Exit Ticket", variant="primary")
             
-            with gr.Row():
-                exit_ticket_output = gr.HTML(label="Your Personalized Exit Ticket")
-                video_outputs = []
-                for i in range(3):
-                    video_outputs.append(gr.Video(label=f"Recommended Video {i+1}", visible=False))
+                with gr.Row():
+                    exit_ticket_output = gr.HTML(label="Your Personalized Exit Ticket")
+                    video_outputs = []
+                    for i in range(3):
+                        video_outputs.append(gr.Video(label=f"Recommended Video {i+1}", visible=False))
             
-            generate_btn.click(
-                fn=create_exit_ticket,
-                inputs=[age, exhibits, favorite_part],
-                outputs=[exit_ticket_output, *video_outputs]
-            )
+                generate_btn.click(
+                    fn=create_exit_ticket,
+                    inputs=[age, exhibits, favorite_part],
+                    outputs=[exit_ticket_output, *video_outputs],
+                    api_name="create_exit_ticket"
+                )
+
+        # Stop any audio still rendering for a session that has left
+        demo.unload(cancel_itinerary_audio)
+
+    # Handlers are async and rate limited by openai_scheduler, so Gradio does not
+    # need to cap how many visitors are in flight per event
+    demo.queue(default_concurrency_limit=None)
+    return demo
+
+
+def create_app():
+    """
+    Returns the ASGI app: the Gradio UI with Prometheus metrics served on
+    /metrics and cached video thumbnails on /thumbnails next to it.
+    """
+    from fastapi import FastAPI
+
+    app = FastAPI()
+    app.add_api_route("/metrics", metrics.metrics_endpoint, methods=["GET"])
+    app.add_api_route("/thumbnails/{video_id}.jpg", thumbnails.thumbnail_endpoint, methods=["GET"])
+    return gr.mount_gradio_app(app, build_demo(), path="/")
+
+
+def main():
+    import uvicorn
+
+    start = time.perf_counter()
+    app = create_app()
+    print(f"app created in {time.perf_counter() - start:.2f}s")
+    uvicorn.run(
+        app,
+        host=os.getenv("GRADIO_SERVER_NAME", "127.0.0.1"),
+        port=int(os.getenv("GRADIO_SERVER_PORT", "7860"))
+    )
+
 
-demo.launch()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
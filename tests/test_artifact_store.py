@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+import artifact_store
+from artifact_store import ArtifactStore, artifact_key
+
+
+def _store(store, key, size, mtime):
+    path = store.write(key, "mp3", [b"x" * size])
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_keys_are_stable_and_content_addressed():
+    assert artifact_key("text", "nova", "mp3") == artifact_key("text", "nova", "mp3")
+    assert artifact_key("text", "nova", "mp3") != artifact_key("text", "alloy", "mp3")
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_bytes=300)
+    _store(store, "a", 100, 1000)
+    _store(store, "b", 100, 2000)
+    _store(store, "c", 100, 3000)
+    assert store.get("a", "mp3") is not None
+    store.write("d", "mp3", [b"x" * 100])
+    # Over budget: the oldest files go until the store is under 90% of it
+    assert store.get("b", "mp3") is None
+    assert store.get("c", "mp3") is None
+    assert store.get("a", "mp3") is not None
+    assert store.get("d", "mp3") is not None
+    assert store.evictions == 2
+
+
+def test_eviction_frees_space_down_to_the_low_water_mark(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_bytes=1000)
+    for index in range(10):
+        _store(store, str(index), 100, 1000 + index)
+    store.write("new", "mp3", [b"x" * 100])
+    remaining = sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+    assert remaining <= 1000 * artifact_store.LOW_WATER_SHARE
+    assert store.get("new", "mp3") is not None
+
+
+def test_writes_under_budget_do_not_rescan(tmp_path, monkeypatch):
+    store = ArtifactStore(str(tmp_path), max_bytes=10_000)
+    store.write("first", "mp3", [b"x"])
+    scans = []
+    evict = store.evict
+    monkeypatch.setattr(store, "evict", lambda keep=None: scans.append(keep) or evict(keep))
+    for index in range(20):
+        store.write(str(index), "mp3", [b"x" * 100])
+    assert scans == []
+    store.write("big", "mp3", [b"x" * 9000])
+    assert len(scans) == 1
+
+
+def test_failed_write_leaves_nothing_behind(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_bytes=1000)
+    with pytest.raises(RuntimeError):
+        with store.writer("key", "mp3") as f:
+            f.write(b"partial")
+            raise RuntimeError("stream cut off")
+    assert store.get("key", "mp3") is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_hits_and_misses_are_counted(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_bytes=1000)
+    store.get("missing", "mp3")
+    store.write("key", "mp3", [b"data"])
+    assert open(store.get("key", "mp3"), "rb").read() == b"data"
+    assert store.stats() == {"hits": 1, "misses": 1, "evictions": 0}
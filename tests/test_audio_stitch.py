@@ -0,0 +1,47 @@
+import io
+import wave
+
+import pytest
+
+from audio_stitch import stitch, strip_id3
+
+
+def _write_wav(path, frames, rate=24000):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(frames)
+
+
+def test_wav_parts_are_merged(tmp_path):
+    _write_wav(tmp_path / "a.wav", b"\x01\x00" * 100)
+    _write_wav(tmp_path / "b.wav", b"\x02\x00" * 50)
+    out = io.BytesIO()
+    stitch([tmp_path / "a.wav", tmp_path / "b.wav"], out, "wav")
+    out.seek(0)
+    with wave.open(out) as f:
+        assert f.getframerate() == 24000
+        assert f.readframes(f.getnframes()) == b"\x01\x00" * 100 + b"\x02\x00" * 50
+
+
+def test_wav_parts_must_share_a_format(tmp_path):
+    _write_wav(tmp_path / "a.wav", b"\x00\x00", rate=24000)
+    _write_wav(tmp_path / "b.wav", b"\x00\x00", rate=16000)
+    with pytest.raises(ValueError):
+        stitch([tmp_path / "a.wav", tmp_path / "b.wav"], io.BytesIO(), "wav")
+
+
+def test_mp3_keeps_only_the_first_id3_tag(tmp_path):
+    tag = b"ID3\x04\x00\x00\x00\x00\x00\x04TAG!"
+    (tmp_path / "a.mp3").write_bytes(tag + b"frames-a")
+    (tmp_path / "b.mp3").write_bytes(tag + b"frames-b")
+    out = io.BytesIO()
+    stitch([tmp_path / "a.mp3", tmp_path / "b.mp3"], out, "mp3")
+    assert out.getvalue() == tag + b"frames-a" + b"frames-b"
+    assert strip_id3(b"frames") == b"frames"
+
+
+def test_opus_is_not_stitched(tmp_path):
+    with pytest.raises(ValueError):
+        stitch([], io.BytesIO(), "opus")
@@ -0,0 +1,74 @@
+import asyncio
+import csv
+import json
+
+import batch
+
+ROSTER = """name,age,interests,language,eta,estimated_staying_time
+Ana,9,Space exploration;Human biology,English,10:05,2 hours
+Ben,10,Human biology;Space exploration,English,10:20,2 hours
+Cy,13,Physics and mechanics,English,11:00,1 hour
+Dee,7,,Spanish,09:30,3 hours (recommended)
+"""
+
+
+def _roster(tmp_path):
+    path = tmp_path / "roster.csv"
+    path.write_text(ROSTER, encoding="utf-8")
+    return batch.read_roster(str(path), batch.itinerary_job)
+
+
+def _run(monkeypatch, tmp_path, jobs, done, fail=()):
+    generated = []
+
+    async def generate(args, use_cache):
+        generated.append(args)
+        if args[0] in fail:
+            raise RuntimeError("model unavailable")
+        return {"itinerary": f"itinerary for {args[0]}"}
+
+    monkeypatch.setitem(batch.MODES, "itinerary", (batch.itinerary_job, generate, "md"))
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    failures = asyncio.run(batch.run_batch("itinerary", jobs, done, checkpoint, str(tmp_path), 2, True))
+    return generated, failures, checkpoint
+
+
+def test_rows_with_the_same_profile_are_generated_once(tmp_path):
+    rows, jobs = _roster(tmp_path)
+    assert len(rows) == 4
+    assert len(jobs) == 3
+    assert rows[0][2] == rows[1][2]
+
+
+def test_interrupted_run_resumes_from_the_checkpoint(monkeypatch, tmp_path):
+    rows, jobs = _roster(tmp_path)
+    generated, failures, checkpoint = _run(monkeypatch, tmp_path, jobs, {}, fail=(13,))
+    assert len(generated) == 3
+    assert len(failures) == 1
+
+    # A write cut short by the interruption is ignored
+    with open(checkpoint, "a", encoding="utf-8") as f:
+        f.write('{"key": "trunc')
+    done = batch.load_checkpoint(checkpoint)
+    assert len(done) == 2
+
+    generated, failures, _ = _run(monkeypatch, tmp_path, jobs, done)
+    assert [args[0] for args in generated] == [13]
+    assert failures == {}
+    assert len(done) == 3
+    assert (tmp_path / done[rows[2][2]]["file"]).read_text(encoding="utf-8") == "itinerary for 13"
+
+
+def test_roster_maps_every_row_to_its_result(monkeypatch, tmp_path):
+    rows, jobs = _roster(tmp_path)
+    done = {}
+    _, failures, _ = _run(monkeypatch, tmp_path, jobs, done, fail=(7,))
+    roster_path = tmp_path / "out.csv"
+    batch.write_roster(str(roster_path), rows, done, failures)
+    with open(roster_path, newline="", encoding="utf-8") as f:
+        written = list(csv.DictReader(f))
+    assert [row["name"] for row in written] == ["Ana", "Ben", "Cy", "Dee"]
+    assert written[0]["file"] == written[1]["file"] != ""
+    assert written[3]["file"] == ""
+    assert written[3]["error"] == "RuntimeError: model unavailable"
+    assert json.loads(open(tmp_path / "checkpoint.jsonl", encoding="utf-8").readline())["mode"] == "itinerary"
@@ -0,0 +1,45 @@
+import json
+import os
+
+from channel_index import BM25Index, ingest, load_index, parse_duration
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "channel_videos.json")
+
+
+def _ingest(tmp_path):
+    path = str(tmp_path / "channel_index.json")
+    count = ingest(fixture=FIXTURE, channel_id="test-channel", path=path)
+    with open(path, encoding="utf-8") as f:
+        return count, path, json.load(f)
+
+
+def test_ingest_normalizes_api_and_index_items(tmp_path):
+    count, _, snapshot = _ingest(tmp_path)
+    assert count == 4
+    assert snapshot["channel_id"] == "test-channel"
+    assert [video["video_id"] for video in snapshot["videos"]] == [
+        "heart000001", "planet00002", "trains00003", "sparks00004",
+    ]
+    assert [video["duration"] for video in snapshot["videos"]] == [253, 3720, 420, 95]
+    assert snapshot["videos"][1]["tags"] == ["space", "planetarium"]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".part")]
+
+
+def test_title_matches_rank_above_description_matches(tmp_path):
+    _, _, snapshot = _ingest(tmp_path)
+    results = BM25Index(snapshot["videos"]).search("giant heart")
+    assert [video["video_id"] for video in results] == ["heart000001", "trains00003"]
+
+
+def test_search_limits_results_and_ignores_unknown_words(tmp_path):
+    _, path, _ = _ingest(tmp_path)
+    index = load_index(path)
+    assert [video["video_id"] for video in index.search("planets space show", k=1)] == ["planet00002"]
+    assert index.search("dinosaurs") == []
+    assert BM25Index([]).search("heart") == []
+
+
+def test_parse_duration():
+    assert parse_duration("PT4M13S") == 253
+    assert parse_duration("P1DT1H") == 90000
+    assert parse_duration(None) == 0
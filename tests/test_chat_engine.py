@@ -0,0 +1,70 @@
+import asyncio
+from types import SimpleNamespace
+
+import metrics
+from chat_engine import ChatEngine, history_to_turns
+from prompts import messages_tokens
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="The child asked about planets."))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5),
+        )
+
+
+def _engine(budget=400):
+    completions = FakeCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return ChatEngine(client, "You are a museum guide.", token_budget=budget, name="test_chat"), completions
+
+
+def _history(turns):
+    return [(f"Question {index}: " + "why is space so big? " * 10, "Because " + "it keeps going. " * 20)
+            for index in range(turns)]
+
+
+def test_history_formats_are_read_alike():
+    messages = [
+        {"role": "user", "content": "Hi"},
+        {"role": "assistant", "content": "Hello!"},
+        {"role": "user", "content": "Why?"},
+    ]
+    assert history_to_turns(messages) == [("Hi", "Hello!"), ("Why?", "")]
+    assert history_to_turns([["Hi", "Hello!"], ["Why?", None]]) == [("Hi", "Hello!"), ("Why?", "")]
+
+
+def test_prompt_stays_within_budget_however_long_the_history():
+    engine, _ = _engine()
+    for turns in (0, 1, 5, 50):
+        messages, tokens = asyncio.run(engine.build_messages("What is a comet? " * 5, _history(turns)))
+        assert tokens == messages_tokens(messages)
+        assert tokens <= engine.token_budget
+        assert messages[-1]["content"].startswith("What is a comet?")
+
+
+def test_long_question_is_trimmed_to_fit():
+    engine, _ = _engine()
+    messages, tokens = asyncio.run(engine.build_messages("tell me everything " * 500, _history(3)))
+    assert tokens <= engine.token_budget
+
+
+def test_older_turns_are_summarized_once():
+    engine, completions = _engine()
+    messages, _ = asyncio.run(engine.build_messages("Next?", _history(20)))
+    assert messages[1]["content"] == "Earlier in this conversation: The child asked about planets."
+    folds = len(completions.calls)
+    assert folds >= 1
+    asyncio.run(engine.build_messages("Again?", _history(20)))
+    assert len(completions.calls) == folds
+
+
+def test_reply_exports_prompt_tokens():
+    engine, _ = _engine()
+    asyncio.run(engine.reply("What is a comet?", _history(2)))
+    assert 'museo_chat_prompt_tokens_count{handler="test_chat",model="gpt-3.5-turbo"} 1' in metrics.render()
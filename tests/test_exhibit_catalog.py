@@ -0,0 +1,45 @@
+import pytest
+
+from exhibit_catalog import accessibility_needs, load_catalog
+from itinerary_planner import plan_visit
+
+
+@pytest.mark.parametrize("text, needs", [
+    ("we're in a tricky situation", []),
+    ("visiting several sites today", []),
+    ("my son needs to sit down often", ["seated"]),
+    ("quiet spaces and a stroller please", ["quiet", "wheelchair"]),
+])
+def test_accessibility_needs_match_whole_words(text, needs):
+    assert accessibility_needs(text) == needs
+
+
+def test_seated_is_a_preference_not_a_filter():
+    plan = plan_visit("10:00", "3 hours (recommended)", [], 10, ["seated"])
+    kinds = {stop["kind"] for stop in plan}
+    assert kinds == {"exhibit", "show"}
+    assert "show" not in {stop["kind"] for stop in plan_visit("10:00", "3 hours (recommended)", [], 10)}
+
+
+def test_top_k_ranks_by_interests_and_question_terms():
+    catalog = load_catalog()
+    titles = [entry["title"] for entry in catalog.top_k(text="How big is the giant heart?")]
+    assert titles[0] == "The Giant Heart"
+    titles = [entry["title"] for entry in catalog.top_k(["Space exploration"], age=5, k=5)]
+    assert set(titles) == {"Space Command", "Wondrous Space", "Fels Planetarium Show"}
+
+
+@pytest.mark.parametrize("question", [
+    "What is a black hole made of?",
+    "Tell me a joke",
+    "",
+])
+def test_top_k_returns_nothing_for_unrelated_questions(question):
+    assert load_catalog().top_k(text=question) == []
+
+
+def test_top_k_respects_age_and_needs():
+    entries = load_catalog().top_k(["History of science"], age=6, needs=["quiet"], k=10)
+    assert entries == []
+    entries = load_catalog().top_k(["History of science"], age=8, needs=["quiet"], k=10)
+    assert [entry["title"] for entry in entries] == ["Benjamin Franklin National Memorial"]
@@ -0,0 +1,31 @@
+import pytest
+
+from itinerary_cache import age_band, normalize_profile, profile_key, round_eta
+
+
+@pytest.mark.parametrize("eta, rounded", [
+    ("10:00", "10:00"),
+    ("10:01", "10:30"),
+    ("10:30", "10:30"),
+    ("10:31", "11:00"),
+    (" 9.45 ", "10:00"),
+    (" later ", "later"),
+])
+def test_round_eta_rounds_up_to_the_half_hour(eta, rounded):
+    assert round_eta(eta) == rounded
+
+
+def test_equivalent_profiles_share_a_key():
+    first = normalize_profile(9, ["Space exploration", "Human biology"], "English",
+                              "  Hands-on ", "", "10:10", "2 hours")
+    second = normalize_profile("9", ["Human biology", "Space exploration"], "English",
+                               "hands-on", None, "10:25", "2 hours")
+    assert profile_key(first) == profile_key(second)
+
+
+def test_different_age_bands_get_different_keys():
+    first = normalize_profile(9, [], "English", "", "", "10:00", "2 hours")
+    second = normalize_profile(13, [], "English", "", "", "10:00", "2 hours")
+    assert profile_key(first) != profile_key(second)
+    assert age_band(9) == "9-11"
+    assert age_band("?") == "unknown"
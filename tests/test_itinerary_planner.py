@@ -0,0 +1,64 @@
+import pytest
+
+from exhibit_catalog import load_catalog
+from itinerary_planner import WALKING_MINUTES, parse_time, plan_visit, visit_window
+
+QUIET_TITLES = {entry["title"] for entry in load_catalog().select(needs=["quiet"])}
+
+
+def _minutes(plan):
+    return [(parse_time(stop["start"]), parse_time(stop["end"])) for stop in plan]
+
+
+def test_no_time_left_before_closing():
+    assert visit_window("17:00", "2 hours") is None
+    assert plan_visit("17:00", "2 hours", [], 10) == []
+
+
+def test_window_too_short_for_any_exhibit():
+    assert visit_window("16:50", "1 hour") == (parse_time("16:50"), parse_time("17:00"))
+    assert plan_visit("16:50", "1 hour", [], 5) == []
+
+
+def test_too_young_for_every_entry():
+    assert visit_window("10:00", "2 hours") is not None
+    assert plan_visit("10:00", "2 hours", [], 2) == []
+
+
+def test_only_entries_suited_to_the_age():
+    titles = {stop["title"] for stop in plan_visit("09:30", "> 4 hours", [], 5)}
+    assert titles
+    assert not titles & {"Your Brain", "Electricity", "Benjamin Franklin National Memorial"}
+
+
+def test_only_entries_with_the_accessibility_needs():
+    plan = plan_visit("10:00", "3 hours (recommended)", ["Space exploration"], 10, ["quiet"])
+    assert plan
+    assert {stop["title"] for stop in plan} <= QUIET_TITLES
+
+
+@pytest.mark.parametrize("eta, duration", [
+    ("09:00", "1 hour"),
+    ("10:00", "2 hours"),
+    ("11:30", "3 hours (recommended)"),
+    ("13:00", "> 4 hours"),
+    ("15:30", "4 hours"),
+])
+def test_plan_fits_the_visit_window(eta, duration):
+    start, end = visit_window(eta, duration)
+    plan = plan_visit(eta, duration, ["Physics and mechanics", "Space exploration"], 9)
+    assert plan
+    times = _minutes(plan)
+    assert times[0][0] >= start
+    assert times[-1][1] <= end
+    for (_, previous_end), (next_start, _) in zip(times, times[1:]):
+        assert next_start >= previous_end + WALKING_MINUTES
+
+
+def test_every_age_in_a_group_gets_the_same_plan():
+    catalog = load_catalog()
+    for age in range(3, 18):
+        group = catalog.age_group(age)
+        assert group <= age
+        assert plan_visit("10:00", "3 hours (recommended)", [], age) == \
+            plan_visit("10:00", "3 hours (recommended)", [], group)
@@ -0,0 +1,103 @@
+import json
+
+from itinerary_stream import StopParser
+
+PLAN = [
+    {"title": "The Giant Heart", "kind": "exhibit", "start": "10:00", "end": "10:25", "minutes": 25},
+    {"title": "Space Command", "kind": "exhibit", "start": "10:30", "end": "11:10", "minutes": 40},
+]
+
+
+def _line(**item):
+    return json.dumps(item) + "\n"
+
+
+def test_stops_complete_as_their_lines_arrive():
+    parser = StopParser(PLAN)
+    text = _line(stop=1, reason="Walk through a heart.") + _line(stop=2, reason="Steer a mission.")
+    assert parser.feed(text[:10]) == []
+    completed = parser.feed(text[10:])
+    assert [stop["number"] for stop in completed] == [1, 2]
+    assert completed[1]["title"] == "Space Command"
+    parser.feed('{"tip": "Start early."}')
+    assert parser.close() == []
+    assert parser.complete
+    assert parser.markdown() == (
+        "1. The Giant Heart - Walk through a heart.\n"
+        "2. Space Command - Steer a mission.\n"
+        "\n💡 Start early."
+    )
+
+
+def test_fallback_keeps_parsed_stops_and_the_rest_as_written():
+    parser = StopParser(PLAN)
+    parser.feed(_line(stop=1, reason="Walk through a heart."))
+    parser.feed("Next, head upstairs to Space Command.\nIt is great")
+    parser.close()
+    assert parser.failed
+    assert not parser.complete
+    assert parser.markdown() == (
+        "1. The Giant Heart - Walk through a heart.\n"
+        "Next, head upstairs to Space Command.\nIt is great"
+    )
+
+
+def test_out_of_order_stop_fails():
+    parser = StopParser(PLAN)
+    parser.feed(_line(stop=2, reason="Steer a mission."))
+    assert parser.failed
+    assert parser.stops == []
+
+
+def test_missing_stops_are_not_complete():
+    parser = StopParser(PLAN)
+    parser.feed(_line(stop=1, reason="Walk through a heart.") + _line(tip="Start early."))
+    parser.close()
+    assert not parser.failed
+    assert not parser.complete
+
+
+def _parse(text, truncated=False, step=7):
+    parser = StopParser(PLAN)
+    for index in range(0, len(text), step):
+        parser.feed(text[index:index + step])
+    parser.close(truncated)
+    return parser
+
+
+def test_pretty_printed_objects_parse():
+    parser = _parse('{\n  "stop": 1,\n  "reason": "Walk through a heart."\n}\n'
+                    '{\n  "stop": 2,\n  "reason": "Steer a \\"mission\\"."\n}\n{\n  "tip": "Start early."\n}')
+    assert parser.complete
+    assert parser.stops[1]["reason"] == 'Steer a "mission".'
+    assert parser.tip == "Start early."
+
+
+def test_one_json_array_in_a_code_fence_parses():
+    parser = _parse('```json\n[{"stop": 1, "reason": "Walk through a heart."},\n'
+                    ' {"stop": 2, "reason": "Steer a mission."}, {"tip": "Start early."}]\n```')
+    assert parser.complete
+    assert [stop["number"] for stop in parser.stops] == [1, 2]
+
+
+def test_stop_cut_off_by_the_token_cap_shows_its_reason():
+    parser = _parse(_line(stop=1, reason="Walk through a heart.") + '{"stop": 2, "reason": "Steer a mis',
+                    truncated=True)
+    assert not parser.complete
+    assert parser.markdown() == "1. The Giant Heart - Walk through a heart.\n2. Space Command - Steer a mis"
+
+
+def test_reason_in_progress_streams():
+    parser = StopParser(PLAN)
+    parser.feed(_line(stop=1, reason="Walk through a heart.") + '{"stop": 2, "reason": "Steer')
+    assert parser.markdown().endswith("\n2. Space Command - Steer")
+    parser.feed(' a mission.')
+    assert parser.markdown().endswith("\n2. Space Command - Steer a mission.")
+    assert len(parser.stops) == 1
+    assert not parser.failed
+
+
+def test_reasons_after_a_failure_are_shown_as_stop_lines():
+    parser = _parse(_line(stop=2, reason="Steer a mission.") + _line(tip="Start early."))
+    assert parser.failed
+    assert parser.markdown() == "2. Space Command - Steer a mission.\n\n💡 Start early."
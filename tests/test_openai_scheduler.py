@@ -0,0 +1,115 @@
+import asyncio
+import time
+from email.utils import formatdate
+
+import pytest
+
+import openai_scheduler
+from openai_scheduler import ModelLimiter, TokenBucket, parse_retry_after, retry_delay
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 1) == pytest.approx(0.0)
+    # A request larger than the bucket waits for a full bucket, not forever
+    assert bucket.wait_time(600, now + 1) == pytest.approx(59.0)
+
+
+def test_interactive_requests_are_granted_before_background_ones():
+    async def main():
+        limiter = ModelLimiter("test-model", rpm=6000, tpm=10 ** 9)
+        limiter.requests.level = 0
+        granted = []
+
+        async def request(name, priority):
+            await limiter.acquire(1, priority)
+            granted.append(name)
+
+        await asyncio.gather(
+            request("background 1", openai_scheduler.PRIORITY_BACKGROUND),
+            request("background 2", openai_scheduler.PRIORITY_BACKGROUND),
+            request("interactive 1", openai_scheduler.PRIORITY_INTERACTIVE),
+            request("interactive 2", openai_scheduler.PRIORITY_INTERACTIVE),
+        )
+        return granted
+
+    assert asyncio.run(main()) == ["interactive 1", "interactive 2", "background 1", "background 2"]
+
+
+def test_token_limit_delays_large_requests():
+    async def main():
+        limiter = ModelLimiter("test-model", rpm=10 ** 6, tpm=6000)
+        start = time.monotonic()
+        await limiter.acquire(6000, openai_scheduler.PRIORITY_INTERACTIVE)
+        await limiter.acquire(50, openai_scheduler.PRIORITY_INTERACTIVE)
+        return time.monotonic() - start
+
+    # 50 tokens at 100 tokens per second
+    assert asyncio.run(main()) == pytest.approx(0.5, abs=0.2)
+
+
+@pytest.mark.parametrize("headers, delay", [
+    ({"retry-after-ms": "1500"}, 1.5),
+    ({"retry-after": "2"}, 2.0),
+    ({"retry-after": "0.25"}, 0.25),
+    ({"retry-after": formatdate(time.time() - 60, usegmt=True)}, 0.0),
+    ({"retry-after": "soon"}, None),
+    ({}, None),
+])
+def test_parse_retry_after(headers, delay):
+    assert parse_retry_after(headers) == delay
+
+
+def test_retry_after_http_date_in_the_future():
+    delay = parse_retry_after({"retry-after": formatdate(time.time() + 20, usegmt=True)})
+    assert 18 <= delay <= 20
+
+
+def test_retry_delay_honours_retry_after_up_to_the_cap():
+    assert retry_delay(openai_scheduler.RateLimited("429", 3.0), 0) == 3.0
+    assert retry_delay(openai_scheduler.RateLimited("429", 3600.0), 0) == openai_scheduler.BACKOFF_CAP
+    for attempt in range(8):
+        delay = retry_delay(openai_scheduler.TransientError("503"), attempt)
+        assert 0 <= delay <= min(openai_scheduler.BACKOFF_CAP, openai_scheduler.BACKOFF_BASE * 2 ** attempt)
+
+
+def _call(outcomes, monkeypatch, max_retries=3):
+    monkeypatch.setattr(openai_scheduler, "MAX_RETRIES", max_retries)
+    monkeypatch.setattr(openai_scheduler, "retry_delay", lambda error, attempt: 0)
+    calls = []
+
+    async def flaky():
+        outcome = outcomes[len(calls)]
+        calls.append(outcome)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def main():
+        return await openai_scheduler.acall("test-retry-model", flaky, tokens=1)
+
+    return lambda: asyncio.run(main()), calls
+
+
+def test_transient_failures_are_retried(monkeypatch):
+    run, calls = _call([openai_scheduler.RateLimited("429"), asyncio.TimeoutError(), "ok"], monkeypatch)
+    assert run() == "ok"
+    assert len(calls) == 3
+
+
+def test_other_errors_are_not_retried(monkeypatch):
+    run, calls = _call([ValueError("bad request"), "ok"], monkeypatch)
+    with pytest.raises(ValueError):
+        run()
+    assert len(calls) == 1
+
+
+def test_retries_give_up_after_the_limit(monkeypatch):
+    run, calls = _call([openai_scheduler.TransientError("503")] * 3, monkeypatch, max_retries=2)
+    with pytest.raises(openai_scheduler.TransientError):
+        run()
+    assert len(calls) == 3
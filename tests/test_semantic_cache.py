@@ -0,0 +1,22 @@
+from semantic_cache import SemanticCache
+
+
+def test_similar_question_in_the_same_band_hits():
+    cache = SemanticCache(threshold=0.8)
+    cache.store("6-8", "How does the giant heart work?", "It pumps blood.")
+    assert cache.lookup("6-8", "how does the giant heart work") == "It pumps blood."
+    assert cache.lookup("12-14", "How does the giant heart work?") is None
+    assert cache.lookup("6-8", "Where is the planetarium?") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_least_recently_used_entry_is_replaced():
+    cache = SemanticCache(threshold=0.99, max_entries=2)
+    cache.store("6-8", "first question about trains", "trains")
+    cache.store("6-8", "second question about planets", "planets")
+    cache.lookup("6-8", "first question about trains")
+    cache.store("6-8", "third question about electricity", "electricity")
+    assert cache.lookup("6-8", "first question about trains") == "trains"
+    assert cache.lookup("6-8", "second question about planets") is None
+    assert cache.stats()["entries"] == {"6-8": 2}
@@ -0,0 +1,32 @@
+from tts import split_for_speech
+
+ITINERARY = "\n".join(
+    f"{number}. Exhibit {number} - " + "A sentence about why it fits. " * 12
+    for number in range(1, 5)
+) + "\n\n💡 **Start** with the shows."
+
+
+def test_one_piece_per_item():
+    pieces = split_for_speech(ITINERARY, max_chars=1200, min_chars=300)
+    assert [piece.split(" - ")[0] for piece in pieces[:4]] == [f"{n}. Exhibit {n}" for n in range(1, 5)]
+    assert pieces[-1] == "💡 Start with the shows."
+
+
+def test_short_items_are_joined():
+    pieces = split_for_speech("1. A - short\n2. B - short\n3. C - short", min_chars=300)
+    assert pieces == ["1. A - short\n2. B - short\n3. C - short"]
+
+
+def test_long_items_split_at_sentences():
+    pieces = split_for_speech("1. A - " + "One more sentence here. " * 20, max_chars=100)
+    assert len(pieces) > 1
+    assert all(len(piece) <= 100 for piece in pieces)
+    assert all(piece.endswith(".") for piece in pieces)
+
+
+def test_pieces_are_stable_as_lines_arrive():
+    lines = ITINERARY.splitlines()
+    full = split_for_speech(ITINERARY)
+    for count in range(1, len(lines)):
+        partial = split_for_speech("\n".join(lines[:count]))
+        assert partial[:-1] == full[:len(partial) - 1]
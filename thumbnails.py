@@ -0,0 +1,56 @@
+"""
+Local cache of YouTube video thumbnails for click-to-load video facades.
+
+Exit tickets show each recommended video as a thumbnail and title, and
+only load the YouTube player when it is tapped. Thumbnails are fetched
+from YouTube once, kept in a size-bounded local store, and served by the
+app itself on /thumbnails/<video_id>.jpg with long browser caching.
+"""
+import re
+
+import http_client
+import metrics
+from artifact_store import thumbnail_store
+
+THUMBNAIL_URL = f"https://{http_client.THUMBNAIL_HOST}/vi/{{video_id}}/mqdefault.jpg"
+BROWSER_CACHE_SECONDS = 7 * 24 * 3600
+
+_VIDEO_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,32}")
+
+
+def thumbnail_path(video_id):
+    """
+    Returns the local path of a video's thumbnail, fetching it on a miss.
+    Raises ValueError for an invalid video id.
+    """
+    if not _VIDEO_ID_RE.fullmatch(video_id or ""):
+        raise ValueError(f"invalid video id: {video_id!r}")
+    path = thumbnail_store.get(video_id, "jpg")
+    if path is not None:
+        return path
+
+    session = http_client.get_requests_session()
+    with metrics.span("thumbnails", "fetch"):
+        response = session.get(THUMBNAIL_URL.format(video_id=video_id), timeout=10)
+        response.raise_for_status()
+    with thumbnail_store.writer(video_id, "jpg") as f:
+        f.write(response.content)
+    return thumbnail_store.path_for(video_id, "jpg")
+
+
+def thumbnail_endpoint(video_id: str):
+    """
+    FastAPI route handler serving a cached thumbnail.
+    """
+    from fastapi.responses import FileResponse, Response
+
+    try:
+        path = thumbnail_path(video_id)
+    except Exception as e:
+        print(f"Error loading thumbnail for {video_id!r}: {e}")
+        return Response(status_code=404)
+    return FileResponse(
+        path,
+        media_type="image/jpeg",
+        headers={"Cache-Control": f"public, max-age={BROWSER_CACHE_SECONDS}, immutable"},
+    )
@@ -0,0 +1,321 @@
+import asyncio
+import os
+import re
+
+import http_client
+import metrics
+import openai_scheduler
+from artifact_store import artifact_key, audio_store
+from audio_stitch import STITCHABLE_FORMATS, stitch, strip_id3
+
+TTS_MODEL = "gpt-4o-mini-tts"
+# Same variable the OpenAI SDK reads, so TTS follows the chat clients
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+TTS_INSTRUCTIONS = (
+	"Voice: Friendly and enthusiastic, like a museum guide talking to kids. "
+	"Tone: Excited, informative, curious. Delivery: Clear and fun."
+)
+# Compressed codecs are a fraction of the size of WAV; opus is smallest
+TTS_FORMAT = os.getenv("MUSEO_TTS_FORMAT", "mp3")
+# Streaming playback sends chunks to the browser as they arrive. Gradio's
+# streaming player takes MP3, so streams use it whatever TTS_FORMAT is.
+TTS_STREAMING = os.getenv("MUSEO_TTS_STREAMING", "1") == "1"
+STREAM_FORMAT = "mp3"
+READ_CHUNK_BYTES = 64 * 1024
+
+
+# Long itineraries are synthesized in pieces of at most this many
+# characters (well under the model's input limit), several at a time
+MAX_CHUNK_CHARS = int(os.getenv("MUSEO_TTS_CHUNK_CHARS", "1200"))
+# Short neighbouring items (e.g. schedule lines) share one request
+MIN_CHUNK_CHARS = 300
+CHUNK_CONCURRENCY = int(os.getenv("MUSEO_TTS_CHUNK_CONCURRENCY", "4"))
+
+_ITEM_RE = re.compile(r"^\s*\d+\.\s")
+_SENTENCE_RE = re.compile(r"(?<=[.!?。！？])\s+")
+_MARKDOWN_RE = re.compile(r"[#*_`>]+")
+
+# Renders in progress on the shared loop, so identical concurrent requests
+# wait for one API call instead of each starting their own
+_in_flight = {}
+
+
+def _split_long(text, max_chars):
+	pieces = []
+	current = ""
+	for sentence in _SENTENCE_RE.split(text):
+		while len(sentence) > max_chars:
+			pieces.append(sentence[:max_chars])
+			sentence = sentence[max_chars:]
+		if current and len(current) + 1 + len(sentence) > max_chars:
+			pieces.append(current)
+			current = sentence
+		else:
+			current = f"{current} {sentence}" if current else sentence
+	if current:
+		pieces.append(current)
+	return pieces
+
+
+def split_for_speech(text, max_chars=MAX_CHUNK_CHARS, min_chars=MIN_CHUNK_CHARS):
+	"""
+	Splits an itinerary into speakable pieces: one per "Number. Title -
+	explanation" item, with other text grouped by paragraph. Items shorter
+	than min_chars are joined with their neighbours, and pieces longer than
+	max_chars are split at sentence boundaries. Markdown markers are dropped
+	so they are not read aloud.
+	"""
+	pieces = []
+	current = []
+	for line in text.splitlines():
+		line = _MARKDOWN_RE.sub("", line).strip()
+		if not line or _ITEM_RE.match(line):
+			if current:
+				pieces.append(" ".join(current))
+			current = [line] if line else []
+		else:
+			current.append(line)
+	if current:
+		pieces.append(" ".join(current))
+
+	merged = []
+	for piece in pieces:
+		if merged and len(merged[-1]) + 1 + len(piece) <= min_chars:
+			merged[-1] += "\n" + piece
+		else:
+			merged.append(piece)
+	return [part for piece in merged for part in _split_long(piece, max_chars)]
+
+
+def _chunk_format(audio_format):
+	# Ogg/Opus files cannot simply be joined, so chunked renders fall back to MP3
+	return audio_format if audio_format in STITCHABLE_FORMATS else "mp3"
+
+
+async def tts_itinerary(text, instructions, voice="nova"):
+	"""
+	Returns the path of a rendering of the text, reusing the cached file
+	when the same text, voice, instructions, model and format were rendered
+	before. Long texts are synthesized piece by piece in parallel and
+	joined; each piece is cached on its own, so an edited itinerary only
+	re-synthesizes the pieces that changed.
+	"""
+	pieces = split_for_speech(text)
+	if len(pieces) <= 1:
+		return await _speech_file(pieces[0] if pieces else text, instructions, voice, TTS_FORMAT)
+
+	audio_format = _chunk_format(TTS_FORMAT)
+	key = artifact_key(pieces, voice, instructions, TTS_MODEL, audio_format)
+	cached_path = audio_store.get(key, audio_format)
+	if cached_path is not None:
+		return cached_path
+
+	slots = asyncio.Semaphore(CHUNK_CONCURRENCY)
+
+	async def render(piece):
+		async with slots:
+			return await _speech_file(piece, instructions, voice, audio_format)
+
+	paths = await asyncio.gather(*[render(piece) for piece in pieces])
+	# File I/O runs in a thread to keep the shared loop free for API calls
+	return await asyncio.to_thread(_store_stitched, key, paths, audio_format)
+
+
+def _store_stitched(key, paths, audio_format):
+	with audio_store.writer(key, audio_format) as f:
+		stitch(paths, f, audio_format)
+	return audio_store.path_for(key, audio_format)
+
+
+async def prewarm_speech(text, instructions, voice="nova"):
+	"""
+	Renders the text into the audio cache ahead of time: every piece a
+	stream will read when streaming is on, otherwise the whole file.
+	"""
+	if not TTS_STREAMING:
+		await tts_itinerary(text, instructions, voice)
+		return
+
+	slots = asyncio.Semaphore(CHUNK_CONCURRENCY)
+
+	async def render(piece):
+		async with slots:
+			await _speech_file(piece, instructions, voice, STREAM_FORMAT)
+
+	await asyncio.gather(*[render(piece) for piece in split_for_speech(text) or [text]])
+
+
+def prefetch_speech(text, instructions, started, voice="nova"):
+	"""
+	Starts rendering the pieces of a partial itinerary that appending more
+	lines can no longer change (all but the last), skipping pieces already
+	in started. The full text's later render picks them up from the cache
+	or the renders in progress. Returns the new tasks.
+	"""
+	audio_format = STREAM_FORMAT if TTS_STREAMING else _chunk_format(TTS_FORMAT)
+	tasks = []
+	for piece in split_for_speech(text)[:-1]:
+		if piece in started:
+			continue
+		started.add(piece)
+		task = asyncio.ensure_future(_speech_file(piece, instructions, voice, audio_format))
+		# Failures resurface when the full text is rendered
+		task.add_done_callback(lambda task: task.cancelled() or task.exception())
+		tasks.append(task)
+	return tasks
+
+
+async def _speech_file(text, instructions, voice, audio_format):
+	"""
+	Returns the path of a single-request rendering of the text, from the
+	cache or shared with an identical render already in progress.
+	"""
+	key = artifact_key(text, voice, instructions, TTS_MODEL, audio_format)
+	cached_path = audio_store.get(key, audio_format)
+	if cached_path is not None:
+		return cached_path
+
+	entry = _in_flight.get(key)
+	if entry is None:
+		task = http_client.get_loop().create_task(_render_speech(key, text, instructions, voice, audio_format))
+		entry = _in_flight[key] = {"task": task, "waiters": 0}
+		task.add_done_callback(lambda _: _in_flight.pop(key, None))
+
+	# A cancelled waiter only stops the render when nobody else is waiting on it
+	entry["waiters"] += 1
+	try:
+		return await asyncio.shield(entry["task"])
+	except asyncio.CancelledError:
+		if entry["waiters"] == 1:
+			entry["task"].cancel()
+		raise
+	finally:
+		entry["waiters"] -= 1
+
+
+def _read_file(path):
+	with open(path, "rb") as f:
+		return f.read()
+
+
+async def _read_chunks(path, skip_id3=False):
+	data = await asyncio.to_thread(_read_file, path)
+	if skip_id3:
+		data = strip_id3(data)
+	for offset in range(0, len(data), READ_CHUNK_BYTES):
+		yield data[offset:offset + READ_CHUNK_BYTES]
+
+
+async def stream_speech(text, instructions, voice="nova"):
+	"""
+	Yields an MP3 rendering of the text in chunks as it downloads, so
+	playback can start right away. For long texts the first piece streams
+	live while the rest are synthesized in parallel and follow in order.
+	"""
+	pieces = split_for_speech(text)
+	if len(pieces) <= 1:
+		async for chunk in _stream_piece(pieces[0] if pieces else text, instructions, voice):
+			yield chunk
+		return
+
+	slots = asyncio.Semaphore(CHUNK_CONCURRENCY - 1 or 1)
+
+	async def render(piece):
+		async with slots:
+			return await _speech_file(piece, instructions, voice, STREAM_FORMAT)
+
+	loop = asyncio.get_running_loop()
+	rest = [loop.create_task(render(piece)) for piece in pieces[1:]]
+	try:
+		async for chunk in _stream_piece(pieces[0], instructions, voice):
+			yield chunk
+		for task in rest:
+			async for chunk in _read_chunks(await task, skip_id3=True):
+				yield chunk
+	finally:
+		for task in rest:
+			task.cancel()
+
+
+async def _stream_piece(text, instructions, voice):
+	key = artifact_key(text, voice, instructions, TTS_MODEL, STREAM_FORMAT)
+	if key in _in_flight:
+		# A prefetch is already rendering this piece: wait for it rather
+		# than paying for a second request, then play the file
+		cached_path = await _speech_file(text, instructions, voice, STREAM_FORMAT)
+	else:
+		cached_path = audio_store.get(key, STREAM_FORMAT)
+	if cached_path is not None:
+		async for chunk in _read_chunks(cached_path):
+			yield chunk
+		return
+
+	tokens = openai_scheduler.estimate_tokens(text=text + instructions, max_tokens=0)
+	resp = await openai_scheduler.acall(
+		TTS_MODEL, _open_speech, text, instructions, voice, STREAM_FORMAT, tokens=tokens
+	)
+	chunks = []
+	try:
+		async for chunk in resp.content.iter_chunked(READ_CHUNK_BYTES):
+			chunks.append(chunk)
+			yield chunk
+	finally:
+		resp.release()
+	# Only a stream that played to the end is cached
+	await asyncio.to_thread(audio_store.write, key, STREAM_FORMAT, chunks)
+
+
+async def _render_speech(key, text, instructions, voice, response_format):
+	tokens = openai_scheduler.estimate_tokens(text=text + instructions, max_tokens=0)
+	return await openai_scheduler.acall(
+		TTS_MODEL, _request_speech, key, text, instructions, voice, response_format, tokens=tokens
+	)
+
+
+async def _open_speech(text, instructions, voice, response_format):
+	"""
+	Starts a speech request and returns the response once its headers are
+	in, leaving the body to be streamed. The caller must release it.
+	"""
+	url = f"{OPENAI_BASE_URL}/audio/speech"
+	headers = {
+		"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
+		"Content-Type": "application/json"
+	}
+	payload = {
+		"model": TTS_MODEL,
+		"input": text,
+		"voice": voice,
+		"instructions": instructions,
+		"response_format": response_format
+	}
+
+	session = http_client.get_session(http_client.OPENAI_HOST)
+	with metrics.span("tts", "api", TTS_MODEL):
+		resp = await session.post(url, headers=headers, json=payload)
+	if resp.status == 429 or resp.status >= 500:
+		error_text = await resp.text()
+		retry_after = openai_scheduler.parse_retry_after(resp.headers)
+		resp.release()
+		# Rate limits and server errors are retried by openai_scheduler.acall
+		if resp.status == 429:
+			raise openai_scheduler.RateLimited(f"TTS rate limited: {error_text}", retry_after)
+		raise openai_scheduler.TransientError(f"TTS failed: {resp.status} - {error_text}", retry_after)
+	if resp.status != 200:
+		error_text = await resp.text()
+		resp.release()
+		raise Exception(f"TTS failed: {resp.status} - {error_text}")
+	return resp
+
+
+async def _request_speech(key, text, instructions, voice, response_format):
+	resp = await _open_speech(text, instructions, voice, response_format)
+	try:
+		chunks = [chunk async for chunk in resp.content.iter_chunked(READ_CHUNK_BYTES)]
+	finally:
+		resp.release()
+	return await asyncio.to_thread(audio_store.write, key, response_format, chunks)
+
+
+def sync_tts_wrapper(text):
+	return http_client.run(tts_itinerary(text, TTS_INSTRUCTIONS))
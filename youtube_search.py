@@ -0,0 +1,152 @@
+"""
+Video recommendations from The Franklin Institute YouTube channel.
+
+Search results are cached persistently per query. Fresh entries are served
+directly; entries past their TTL but still inside the stale window are served
+at once while a background refresh fetches new results. Run
+
+    python youtube_search.py warm
+
+to pre-fill the cache for every exhibit offered in the exit ticket tab.
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+if __name__ == "__main__":
+    # Run as a script: settings are read at import time, so load .env first
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+import channel_index
+import http_client
+import metrics
+from cache_store import SqliteCache
+
+CHANNEL_ID = channel_index.CHANNEL_ID
+
+EXHIBITS = ["The Giant Heart", "Your Brain", "Changing Earth", "Space Command", "The Train Factory", "Sir Isaac's Loft", "SportsZone"]
+
+CACHE_TTL = float(os.getenv("MUSEO_YOUTUBE_TTL", str(24 * 3600)))
+STALE_WINDOW = float(os.getenv("MUSEO_YOUTUBE_STALE_WINDOW", str(7 * 24 * 3600)))
+
+_cache = SqliteCache("youtube_search")
+_refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="museo-youtube")
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def fetch_youtube_videos(query, CHANNEL_ID=CHANNEL_ID):
+    """
+    Searches YouTube videos from The Franklin Institute channel based on a query
+    and returns relevant videos as (title, video_id) pairs. Always hits the API.
+    """
+    base_url = f"{channel_index.API_BASE}/search"
+    params = {
+        "key": os.getenv("YOUTUBE_API_KEY"),
+        "channelId": CHANNEL_ID,
+        "part": "snippet",
+        "q": query,
+        "maxResults": 3,
+        "order": "relevance",
+        "type": "video"
+    }
+
+    session = http_client.get_requests_session()
+    with metrics.span("youtube_search", "api"):
+        response = session.get(base_url, params=params, timeout=10)
+        response.raise_for_status()
+    data = response.json()
+
+    results = []
+    for item in data.get("items", []):
+        video_id = item["id"]["videoId"]
+        title = item["snippet"]["title"]
+        results.append((title, video_id))
+
+    return results
+
+
+def _cache_key(query, channel_id):
+    return f"{channel_id}:{query.strip().lower()}"
+
+
+def refresh_youtube_videos(query, CHANNEL_ID=CHANNEL_ID):
+    """
+    Fetches fresh results for a query and stores them in the cache.
+    """
+    results = fetch_youtube_videos(query, CHANNEL_ID)
+    _cache.set(_cache_key(query, CHANNEL_ID), [list(video) for video in results])
+    return results
+
+
+def _refresh_in_background(query, channel_id):
+    key = _cache_key(query, channel_id)
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def refresh():
+        try:
+            refresh_youtube_videos(query, channel_id)
+        except Exception as e:
+            print(f"Error refreshing YouTube videos for {query!r}: {e}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    _refresh_pool.submit(refresh)
+
+
+def search_youtube_videos(query, CHANNEL_ID=CHANNEL_ID):
+    """
+    Returns (title, video_id) pairs for a query, served from the local
+    channel index or the query cache when possible. Returns an empty list if
+    nothing is cached and the API fails.
+    """
+    # The local channel index answers without quota or a round trip; the
+    # live search is only used until an index has been ingested
+    if CHANNEL_ID == channel_index.CHANNEL_ID:
+        recommended = channel_index.recommend_videos(query)
+        if recommended is not None:
+            return recommended
+
+    cached = _cache.get(_cache_key(query, CHANNEL_ID))
+    if cached is not None:
+        videos, stored_at = cached
+        age = time.time() - stored_at
+        if age < CACHE_TTL:
+            return [tuple(video) for video in videos]
+        if age < CACHE_TTL + STALE_WINDOW:
+            _refresh_in_background(query, CHANNEL_ID)
+            return [tuple(video) for video in videos]
+
+    try:
+        return refresh_youtube_videos(query, CHANNEL_ID)
+    except Exception as e:
+        print(f"Error searching YouTube videos: {e}")
+        if cached is not None:
+            return [tuple(video) for video in cached[0]]
+        return []
+
+
+def warm_cache(queries=EXHIBITS):
+    """
+    Fetches and caches results for every query, e.g. all exhibits.
+    """
+    for query in queries:
+        try:
+            videos = refresh_youtube_videos(query)
+            print(f"cached {len(videos)} videos for {query!r}")
+        except Exception as e:
+            print(f"Error warming YouTube cache for {query!r}: {e}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["warm"]:
+        sys.exit("usage: python youtube_search.py warm")
+    warm_cache()